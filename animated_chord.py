@@ -1,11 +1,13 @@
 import pandas as pd
 import plotly.graph_objects as go
+import corpus
 
-years = ['2122', '2223', '2324', '2425']
+DATA_DIR = r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\newdata"
+years = corpus.discover_periods(DATA_DIR)
 dataframes = {}
 
 for year in years:
-    file_path = f'C:/Users\w1782\Desktop\大一下作业\数据可视化作业\dataset/newdata/{year}_matrix_article.csv'
+    file_path = rf"{DATA_DIR}\{year}_matrix_article.csv"
     dataframes[year] = pd.read_csv(file_path)
 
 # 合并所有数据集，并添加年份列
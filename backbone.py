@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# 显著性水平（disparity filter 的默认 alpha）
+DISPARITY_ALPHA = 0.05
+
+
+def _upper_edges(A):
+    # 对称邻接矩阵的上三角（不含对角线）边: (i, j, w)，i < j
+    upper = sp.triu(sp.csr_matrix(A), k=1).tocoo()
+    keep = upper.data != 0
+    return upper.row[keep], upper.col[keep], upper.data[keep].astype(float)
+
+
+def disparity_pvalues(A):
+    """
+    Serrano 等人的 disparity filter: 边 (i, j) 相对端点 i 的 p 值为 (1 - w_ij / s_i)^(k_i - 1)
+    取两个端点中较小的 p 值（任一端点认为显著即保留）；度为1的端点不作判断 (p = 1)
+    参数:
+        A: 对称的稀疏邻接矩阵（加权）
+    返回:
+        (i, j, w, p): 上三角边及其 p 值
+    """
+    i, j, w = _upper_edges(A)
+    n = A.shape[0]
+    strength = np.bincount(i, weights=w, minlength=n) + np.bincount(j, weights=w, minlength=n)
+    degree = np.bincount(i, minlength=n) + np.bincount(j, minlength=n)
+
+    def pvalue(node):
+        k = degree[node]
+        p = np.power(1 - w / strength[node], k - 1)
+        return np.where(k > 1, p, 1.0)
+
+    return i, j, w, np.minimum(pvalue(i), pvalue(j))
+
+
+def top_k_mask(i, j, w, k):
+    """每个节点保留权重最大的k条边；一条边只要在任一端点的前k条中就保留"""
+    m = len(w)
+    ends = np.concatenate([i, j])
+    edge = np.concatenate([np.arange(m), np.arange(m)])
+    weights = np.concatenate([w, w])
+    order = np.lexsort((-weights, ends))
+    sorted_ends = ends[order]
+    group_start = np.searchsorted(sorted_ends, sorted_ends, side='left')
+    rank = np.arange(len(order)) - group_start
+    keep = np.zeros(m, dtype=bool)
+    keep[edge[order][rank < k]] = True
+    return keep
+
+
+def backbone(A, method='disparity', alpha=DISPARITY_ALPHA, k=None, quantile=None, max_edges=None):
+    """
+    从对称加权邻接矩阵中提取骨干边
+    参数:
+        method: 'disparity' (p < alpha)、'top_k' (每个节点前k条边) 或 'quantile' (权重不低于全局分位数)
+        alpha, k, quantile: 对应方法的参数；alpha=None 时不做显著性截断，只按 p 值排序（配合 max_edges）
+        max_edges: 边数上限；超出时按显著性（disparity 按 p 值，其余按权重）保留最重要的边
+    返回:
+        上三角 CSR 矩阵，只含保留的边
+    """
+    if method == 'disparity':
+        i, j, w, p = disparity_pvalues(A)
+        keep = p < alpha if alpha is not None else np.ones(len(p), dtype=bool)
+        score = -p
+    elif method == 'top_k':
+        if k is None:
+            raise ValueError("method='top_k' requires k")
+        i, j, w = _upper_edges(A)
+        keep = top_k_mask(i, j, w, k)
+        score = w
+    elif method == 'quantile':
+        if quantile is None:
+            raise ValueError("method='quantile' requires quantile")
+        i, j, w = _upper_edges(A)
+        keep = w >= (np.quantile(w, quantile) if len(w) else 0)
+        score = w
+    else:
+        raise ValueError(f"unknown backbone method: {method}")
+
+    i, j, w, score = i[keep], j[keep], w[keep], score[keep]
+    if max_edges is not None and len(w) > max_edges:
+        # 分数相同时按权重排序，结果与边的输入顺序无关
+        order = np.lexsort((-w, -score))[:max_edges]
+        i, j, w = i[order], j[order], w[order]
+    n = A.shape[0]
+    return sp.csr_matrix((w, (i, j)), shape=(n, n))
+
+
+def backbone_edges(df_matrix, **kwargs):
+    """
+    共现表的骨干边（重复词对先合并），参数同 backbone
+    返回:
+        DataFrame: Entity1, Entity2, CoOccurrence，按共现次数降序
+    """
+    from gen_net import generate_sparse_adjacency
+
+    A, nodes = generate_sparse_adjacency(df_matrix)
+    kept = backbone(A, **kwargs).tocoo()
+    return pd.DataFrame({
+        'Entity1': nodes[kept.row],
+        'Entity2': nodes[kept.col],
+        'CoOccurrence': kept.data
+    }).sort_values('CoOccurrence', ascending=False, ignore_index=True)
@@ -2,10 +2,12 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 from sklearn.preprocessing import MinMaxScaler
-from gen_net import generate_undirected_graph, detect_communities
+from gen_net import generate_undirected_graph, detect_communities, entity_strength
+import corpus
 
 # 定义年份列表
-years = ['2122', '2223', '2324', '2425']
+DATA_DIR = r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\data"
+years = corpus.discover_periods(DATA_DIR)
 
 # 存储每个年份的数据和分区信息
 dataframes = {}
@@ -13,7 +15,7 @@ partitions = {}
 
 # 读取数据并生成社区划分
 for year in years:
-    file_path = rf"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\data\{year}_matrix_article.csv"
+    file_path = rf"{DATA_DIR}\{year}_matrix_article.csv"
     dataframes[year] = pd.read_csv(file_path)
 
     # 生成无向图并检测社区
@@ -40,10 +42,12 @@ nodes = []
 for year in years:
     data = dataframes[year]
     partition = partitions[year]
+    # 每个实体的共现次数之和（一次分组求和）
+    strength = entity_strength(data)
 
     for entity in data['Entity1'].unique():
         # 计算节点大小（基于共现次数）
-        total_cooccurrence = data[(data['Entity1'] == entity) | (data['Entity2'] == entity)]['CoOccurrence'].sum()
+        total_cooccurrence = strength[entity]
         size = min(4 + total_cooccurrence * 0.4, 10)  # 调整节点大小
 
         # 根据实际社区分配颜色
@@ -0,0 +1,269 @@
+import os
+import math
+import numpy as np
+import networkx as nx
+from concurrent.futures import ProcessPoolExecutor
+
+# 抽样近似时的默认失败概率: 以 1 - SAMPLE_DELTA 的概率所有节点的误差都不超过 epsilon
+SAMPLE_DELTA = 0.1
+# 源节点少于这个数时不启动进程池
+MIN_PARALLEL_SOURCES = 64
+
+# 进程池中每个worker持有的图（通过 initializer 只传一次）
+_graph = None
+
+
+def _init_worker(G):
+    global _graph
+    _graph = G
+
+
+def sample_size(n, epsilon, delta=SAMPLE_DELTA):
+    """
+    误差预算对应的源节点抽样数 (Hoeffding + 对n个节点取并集界)
+    参数:
+        n: 节点数
+        epsilon: 归一化中心性允许的绝对误差
+        delta: 失败概率
+    """
+    if n == 0:
+        return 0
+    return min(n, math.ceil(math.log(2 * n / delta) / (2 * epsilon ** 2)))
+
+
+def _sources(G, k, epsilon, delta, seed):
+    nodes = list(G.nodes())
+    if k is None and epsilon is not None:
+        k = sample_size(len(nodes), epsilon, delta)
+    if k is None or k >= len(nodes):
+        return nodes
+    rng = np.random.default_rng(seed)
+    return [nodes[i] for i in sorted(rng.choice(len(nodes), size=k, replace=False))]
+
+
+def _chunks(items, count):
+    size = max(1, math.ceil(len(items) / count))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _map_sources(G, func, sources, args, max_workers):
+    """按源节点分块执行 func(G, chunk, *args)，源节点较多时在进程池中并行"""
+    if max_workers == 1 or len(sources) < MIN_PARALLEL_SOURCES:
+        return [func(G, sources, *args)]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(G,)) as pool:
+        chunks = _chunks(sources, (max_workers or os.cpu_count() or 1) * 4)
+        return list(pool.map(_run_chunk, [func] * len(chunks), chunks, [args] * len(chunks)))
+
+
+def _run_chunk(func, sources, args):
+    return func(_graph, sources, *args)
+
+
+def _betweenness_chunk(G, sources, weight):
+    return nx.betweenness_centrality_subset(G, sources, list(G.nodes()), weight=weight)
+
+
+def betweenness_centrality(G, weight='weight', k=None, epsilon=None, delta=SAMPLE_DELTA, seed=0, max_workers=None):
+    """
+    归一化的中介中心性（与 nx.betweenness_centrality 相同的定义）
+    参数:
+        k: 抽样的源节点数；epsilon: 误差预算（未给出k时按 sample_size 换算成k）
+        两者都为None时精确计算；源节点分块后在进程池中并行
+    返回:
+        dict: 节点 -> 中介中心性
+    """
+    n = G.number_of_nodes()
+    sources = _sources(G, k, epsilon, delta, seed)
+    totals = dict.fromkeys(G.nodes(), 0.0)
+    for part in _map_sources(G, _betweenness_chunk, sources, (weight,), max_workers):
+        for node, value in part.items():
+            totals[node] += value
+    if n <= 2 or not sources:
+        return totals
+    # 分块结果之和即未归一化的中介中心性；抽样时按 n/k 放大
+    scale = 2 / ((n - 1) * (n - 2)) * n / len(sources)
+    return {node: value * scale for node, value in totals.items()}
+
+
+def _closeness_chunk(G, sources):
+    # 精确: 每个源节点的一次BFS给出它自己的接近中心性
+    n = G.number_of_nodes()
+    result = {}
+    for source in sources:
+        lengths = nx.single_source_shortest_path_length(G, source)
+        total = sum(lengths.values())
+        reachable = len(lengths)
+        result[source] = (reachable - 1) / total * (reachable - 1) / (n - 1) if total > 0 and n > 1 else 0.0
+    return result
+
+
+def _distance_chunk(G, sources, nodes):
+    # 抽样: 累加每个节点到各抽样源节点的距离及计数
+    index = {node: i for i, node in enumerate(nodes)}
+    totals = np.zeros(len(nodes))
+    counts = np.zeros(len(nodes), dtype=np.int64)
+    for source in sources:
+        for node, length in nx.single_source_shortest_path_length(G, source).items():
+            if node != source:
+                totals[index[node]] += length
+                counts[index[node]] += 1
+    return totals, counts
+
+
+def closeness_centrality(G, k=None, epsilon=None, delta=SAMPLE_DELTA, seed=0, max_workers=None):
+    """
+    接近中心性（与 nx.closeness_centrality 相同，按连通分量大小修正，不带权重）
+    抽样时用 Eppstein-Wang 估计: 节点到抽样源节点的平均距离近似它到分量内所有节点的平均距离；
+    所在分量中没有抽到源节点的节点按精确方式计算
+    """
+    n = G.number_of_nodes()
+    nodes = list(G.nodes())
+    sources = _sources(G, k, epsilon, delta, seed)
+    if len(sources) == n:
+        result = {}
+        for part in _map_sources(G, _closeness_chunk, sources, (), max_workers):
+            result.update(part)
+        return {node: result[node] for node in nodes}
+
+    totals = np.zeros(n)
+    counts = np.zeros(n, dtype=np.int64)
+    for part_totals, part_counts in _map_sources(G, _distance_chunk, sources, (nodes,), max_workers):
+        totals += part_totals
+        counts += part_counts
+
+    component_size = {}
+    for component in nx.connected_components(G):
+        for node in component:
+            component_size[node] = len(component)
+
+    result = {}
+    missing = []
+    for i, node in enumerate(nodes):
+        reachable = component_size[node]
+        if reachable == 1:
+            result[node] = 0.0
+        elif counts[i] == 0:
+            missing.append(node)
+        else:
+            result[node] = counts[i] / totals[i] * (reachable - 1) / (n - 1)
+    result.update(_closeness_chunk(G, missing))
+    return {node: result[node] for node in nodes}
+
+
+def _block_ids(sizes):
+    return np.repeat(np.arange(len(sizes)), sizes)
+
+
+def _block_sum(values, block, count):
+    return np.bincount(block, weights=values, minlength=count)
+
+
+def sparse_metrics(A, sizes=None, alpha=0.85, max_iter=1000, tol=1e-6):
+    """
+    在对称的稀疏邻接矩阵上计算度、加权度、特征向量中心性和PageRank
+    参数:
+        A: 对称 CSR 邻接矩阵
+        sizes: A 为多个图的块对角拼接时，各块的节点数；每块单独归一化，一次迭代同时算完所有块
+        alpha, max_iter, tol: 与 networkx 的 pagerank / eigenvector_centrality 相同
+    返回:
+        dict: 列名 -> 数组，定义与 nx.degree_centrality、加权度、
+              nx.eigenvector_centrality(不带权重) 和 nx.pagerank(带权重) 一致
+    """
+    import scipy.sparse as sp
+
+    A = sp.csr_matrix(A, dtype=float)
+    n = A.shape[0]
+    sizes = np.array([n] if sizes is None else sizes, dtype=np.int64)
+    block = _block_ids(sizes)
+    count = len(sizes)
+    block_n = sizes[block].astype(float)
+
+    # 度（自环按 networkx 的习惯计两次）
+    diagonal = A.diagonal() != 0
+    degree = np.diff(A.indptr) + diagonal
+    degree_centrality = degree / np.maximum(block_n - 1, 1)
+    weighted_degree = np.asarray(A.sum(axis=1)).ravel()
+
+    # 特征向量中心性: (A + I) 的幂迭代，不带权重
+    pattern = A.copy()
+    pattern.data[:] = 1.0
+    x = 1.0 / block_n
+    for _ in range(max_iter):
+        last = x
+        x = last + pattern @ last
+        norm = np.sqrt(_block_sum(x ** 2, block, count))
+        x = x / np.where(norm > 0, norm, 1)[block]
+        if np.all(_block_sum(np.abs(x - last), block, count) < sizes * tol):
+            break
+    else:
+        raise nx.PowerIterationFailedConvergence(max_iter)
+    eigenvector = x
+
+    # PageRank: 按加权度做行归一化，悬挂节点的概率均匀分给所在块
+    inverse = np.divide(1.0, weighted_degree, out=np.zeros(n), where=weighted_degree != 0)
+    transition = (sp.diags(inverse) @ A).T.tocsr()
+    dangling = weighted_degree == 0
+    uniform = 1.0 / block_n
+    x = uniform.copy()
+    for _ in range(max_iter):
+        last = x
+        dangling_mass = _block_sum(np.where(dangling, last, 0), block, count)
+        x = alpha * (transition @ last + dangling_mass[block] * uniform) + (1 - alpha) * uniform
+        if np.all(_block_sum(np.abs(x - last), block, count) < sizes * tol):
+            break
+    else:
+        raise nx.PowerIterationFailedConvergence(max_iter)
+    pagerank = x
+
+    return {
+        'DegreeCentrality': degree_centrality,
+        'WeightedDegree': weighted_degree,
+        'EigenvectorCentrality': eigenvector,
+        'PageRank': pagerank,
+    }
+
+
+def graph_metrics(G, weight='weight'):
+    """sparse_metrics 作用在一个networkx图上，返回 DataFrame（Entity 列为节点）"""
+    return yearly_metrics([None], graphs={None: G}, weight=weight).drop(columns='Year')
+
+
+def yearly_metrics(years=None, graphs=None, weight='weight'):
+    """
+    所有年份的稀疏指标: 各年份的邻接矩阵拼成块对角矩阵，一次批量计算
+    参数:
+        years: 年份列表，默认全部年份（给定 graphs 时默认为 graphs 的键）
+        graphs: {年份: networkx图}；None 时直接使用共现存储的年度CSR
+        weight: graphs 中的边权重属性名
+    返回:
+        DataFrame: 列 Year, Entity（来自共现存储时还有 Entity_code）加上 sparse_metrics 的各列，
+        每个年份中出现的实体一行
+    """
+    import pandas as pd
+    import scipy.sparse as sp
+
+    if graphs is not None:
+        years = list(graphs) if years is None else years
+        blocks, labels = [], []
+        for year in years:
+            nodes = list(graphs[year].nodes())
+            blocks.append(nx.to_scipy_sparse_array(graphs[year], nodelist=nodes, weight=weight, format='csr'))
+            labels.append(nodes)
+        columns = {'Entity': [node for nodes in labels for node in nodes]}
+    else:
+        import cooc
+        import corpus
+
+        years = corpus.periods() if years is None else years
+        blocks, labels = [], []
+        for year in years:
+            m = cooc.symmetric(cooc.year_matrix(year))
+            active = cooc.active_codes(m)
+            blocks.append(m[active][:, active])
+            labels.append(active)
+        all_codes = np.concatenate(labels) if labels else np.array([], dtype=np.int32)
+        columns = {'Entity_code': all_codes, 'Entity': corpus.decode(all_codes)}
+
+    sizes = [len(nodes) for nodes in labels]
+    metrics = sparse_metrics(sp.block_diag(blocks, format='csr') if blocks else sp.csr_matrix((0, 0)), sizes)
+    return pd.DataFrame({'Year': np.repeat(np.array(years, dtype=object), sizes), **columns, **metrics})
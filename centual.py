@@ -1,100 +1,139 @@
 import pandas as pd
-import networkx as nx
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import argparse
 from gen_net import generate_undirected_graph, detect_communities
-
-
-def calculate_centralities(G):
-    degree_centrality = nx.degree_centrality(G)
-    weighted_degree = {node: sum(d["weight"] for _, d in G[node].items()) for node in G.nodes}
-
-    # 计算加权度中心性
-    weighted_degree_centrality = nx.betweenness_centrality(G, weight='weight')
-
+import corpus
+import centrality
+
+
+def path_centralities(G, epsilon=None, max_workers=None):
+    """
+    基于最短路径的中心性指标（中介、接近）
+    参数:
+        G: 无向网络图对象
+        epsilon: 误差预算；None 表示精确计算（按源节点分块并行）
+        max_workers: 进程数，1 表示在当前进程内计算
+    返回:
+        DataFrame: Entity, BetweennessCentrality, ClosenessCentrality，每个节点一行
+    """
+    nodes = pd.Series(list(G.nodes()))
+    # 计算中介中心性
+    betweenness_centrality = centrality.betweenness_centrality(G, weight='weight', epsilon=epsilon,
+                                                               max_workers=max_workers)
     # 计算接近中心性
-    closeness_centrality = nx.closeness_centrality(G)
-
-    # 计算特征向量中心性
-    eigenvector_centrality = nx.eigenvector_centrality(G, max_iter=1000)
-
-    # 保存到 DataFrame
-    df_metrics = pd.DataFrame({
-        "Entity": degree_centrality.keys(),
-        "DegreeCentrality": degree_centrality.values(),  # 节点连接数
-        "WeightedDegree": weighted_degree.values(),  # 加权度中心性
-        "BetweennessCentrality": weighted_degree_centrality.values(),  # 中介中心性
-        "ClosenessCentrality": closeness_centrality.values(),  # 接近中心性
-        "EigenvectorCentrality": eigenvector_centrality.values()  # 特征向量中心性
+    closeness_centrality = centrality.closeness_centrality(G, epsilon=epsilon, max_workers=max_workers)
+    return pd.DataFrame({
+        "Entity": nodes,
+        "BetweennessCentrality": nodes.map(betweenness_centrality),  # 中介中心性
+        "ClosenessCentrality": nodes.map(closeness_centrality)  # 接近中心性
     })
 
-    return df_metrics
-# 定义年份列表
-years = ['2122', '2223', '2324', '2425']
 
-# 存储每个年份的数据
-dataframes = {}
+def _merge_metrics(sparse, paths, keys):
+    # 按 keys 合并两类指标，列顺序保持不变
+    merged = sparse.merge(paths, on=keys, how='left')
+    return merged[keys + ["DegreeCentrality", "WeightedDegree", "BetweennessCentrality", "ClosenessCentrality",
+                          "EigenvectorCentrality", "PageRank"]]
+
+
+def calculate_centralities(G, epsilon=None, max_workers=None):
+    """
+    计算一个图各节点的中心性指标
+    参数:
+        G: 无向网络图对象
+        epsilon, max_workers: 见 path_centralities
+    返回:
+        DataFrame: 每个节点一行
+    """
+    # 度、加权度、特征向量中心性和PageRank: 稀疏矩阵运算
+    return _merge_metrics(centrality.graph_metrics(G), path_centralities(G, epsilon, max_workers), ["Entity"])
+
+
+def yearly_path_centralities(year, G, data_dir, epsilon=None, max_workers=None):
+    """一个年份的中介/接近中心性，只有该年份的数据文件变化时才重新计算"""
+    file_path = os.path.join(data_dir, f"{year}_matrix_article.csv")
+    name = 'path_centralities' if epsilon is None else f'path_centralities-eps{epsilon}'
+    return corpus.period_artifact(name, year, lambda: path_centralities(G, epsilon, max_workers),
+                                  sources=[file_path])
+
+
+def all_centralities(graphs, data_dir, epsilon=None, max_workers=None):
+    """
+    所有年份的中心性指标
+    参数:
+        graphs: {年份: 无向网络图}
+    返回:
+        DataFrame: Year, Entity 加上各项指标；稀疏指标对全部年份一次批量计算，路径指标按年份缓存
+    """
+    sparse = centrality.yearly_metrics(graphs=graphs)
+    paths = pd.concat([yearly_path_centralities(year, G, data_dir, epsilon, max_workers).assign(Year=year)
+                       for year, G in graphs.items()], ignore_index=True)
+    return _merge_metrics(sparse, paths, ["Year", "Entity"])
+
 
 # 定义输出路径
 OUTPUT_PATH = r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\newdata"
 
-# 读取数据并存储在字典中
-for year in years:
-    file_path = rf"{OUTPUT_PATH}\{year}_matrix_article.csv"
-    dataframes[year] = pd.read_csv(file_path)
 
-# 存储每个年份的中心性指标
-centralities_by_year = {}
+def main(argv=None):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    parser = argparse.ArgumentParser(description='各年份网络的中心性指标')
+    parser.add_argument('--epsilon', type=float, default=None,
+                        help='中介/接近中心性的误差预算（抽样近似），默认精确计算')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='进程数，默认使用全部CPU')
+    args = parser.parse_args(argv)
 
-# 处理每个年份的数据
-for year in years:
-    print(f"\n处理 {year} 年数据...")
-    df_matrix = dataframes[year]
-    G = generate_undirected_graph(df_matrix)
-    centralities_by_year[year] = calculate_centralities(G)
-    communities_df, _ = detect_communities(G)
-    communities_df.to_csv(f'{OUTPUT_PATH}\\communities_{year}.csv', encoding='utf-8-sig', index=False)
-    print("\n社区检测结果已保存到 communities_{year}.csv")
+    # 定义年份列表（从数据目录中发现）
+    years = corpus.discover_periods(OUTPUT_PATH)
 
-# 合并所有年份的中心性指标
-merged_centralities = pd.concat(centralities_by_year.values(), keys=years).reset_index(level=1, drop=True).reset_index().rename(columns={'index': 'Year'})
+    # 处理每个年份的数据
+    graphs = {}
+    for year in years:
+        print(f"\n处理 {year} 年数据...")
+        graphs[year] = generate_undirected_graph(pd.read_csv(os.path.join(OUTPUT_PATH, f"{year}_matrix_article.csv")))
+        detect_communities(graphs[year], export_path=os.path.join(OUTPUT_PATH, f"communities_{year}.csv"))
 
-# 读取词语分类文件
-category_file = rf"{OUTPUT_PATH}\entity_dict.csv"
-entity_categories = pd.read_csv(category_file)
+    # 所有年份的中心性指标
+    merged_centralities = all_centralities(graphs, OUTPUT_PATH, args.epsilon, args.jobs)
 
-# 合并中心性指标和类别信息
-merged_data = pd.merge(merged_centralities, entity_categories, on='Entity', how='left')
+    # 读取词语分类文件
+    category_file = rf"{OUTPUT_PATH}\entity_dict.csv"
+    entity_categories = pd.read_csv(category_file)
 
-# 提取主要中心性指标
-main_centralities = merged_data[['Year', 'Entity', 'Category', 'DegreeCentrality', 'WeightedDegree', 'BetweennessCentrality', 'ClosenessCentrality', 'EigenvectorCentrality']]
+    # 合并中心性指标和类别信息
+    merged_data = pd.merge(merged_centralities, entity_categories, on='Entity', how='left')
 
-# 获取每个年份每个类别的前5个实体
-top_entities_by_year_category = main_centralities.groupby(['Year', 'Category']).apply(lambda x: x.nlargest(5, 'WeightedDegree')).reset_index(drop=True)
+    # 提取主要中心性指标
+    main_centralities = merged_data[['Year', 'Entity', 'Category', 'DegreeCentrality', 'WeightedDegree', 'BetweennessCentrality', 'ClosenessCentrality', 'EigenvectorCentrality']]
 
-# 绘制条形图
-plt.figure(figsize=(16, 12))
+    # 获取每个年份每个类别的前5个实体
+    top_entities_by_year_category = main_centralities.groupby(['Year', 'Category']).apply(lambda x: x.nlargest(5, 'WeightedDegree')).reset_index(drop=True)
 
-categories = ['产业', '资本', '技术']
-centrality_metric = 'WeightedDegree'
+    # 绘制条形图
+    plt.figure(figsize=(16, 12))
 
-for i, category in enumerate(categories):
-    plt.subplot(2, 2, i + 1)
-    category_data = top_entities_by_year_category[top_entities_by_year_category['Category'] == category]
-    sns.barplot(x='Year', y=centrality_metric, hue='Entity', data=category_data, palette='viridis')
-    plt.title(f'Top 5 Entities by Weighted Degree Centrality - {category}')
-    plt.xlabel('Year')
-    plt.ylabel('Weighted Degree Centrality')
-    plt.xticks(rotation=45)
-    plt.legend(title='Entity', bbox_to_anchor=(1.05, 1), loc='upper left')
+    categories = ['产业', '资本', '技术']
+    centrality_metric = 'WeightedDegree'
 
-plt.tight_layout(rect=[0, 0, 1, 0.95])
-plt.suptitle('Top 5 Entities by Weighted Degree Centrality Across Categories Over Four Years', fontsize=16)
-plt.show()
+    for i, category in enumerate(categories):
+        plt.subplot(2, 2, i + 1)
+        category_data = top_entities_by_year_category[top_entities_by_year_category['Category'] == category]
+        sns.barplot(x='Year', y=centrality_metric, hue='Entity', data=category_data, palette='viridis')
+        plt.title(f'Top 5 Entities by Weighted Degree Centrality - {category}')
+        plt.xlabel('Year')
+        plt.ylabel('Weighted Degree Centrality')
+        plt.xticks(rotation=45)
+        plt.legend(title='Entity', bbox_to_anchor=(1.05, 1), loc='upper left')
 
-# 保存图形为PNG文件
-plt.savefig("top_entities_weighted_degree_centrality.png")
+    plt.tight_layout(rect=[0, 0, 1, 0.95])
+    plt.suptitle('Top 5 Entities by Weighted Degree Centrality Across Categories Over Four Years', fontsize=16)
+    plt.show()
 
+    # 保存图形为PNG文件
+    plt.savefig("top_entities_weighted_degree_centrality.png")
 
 
+if __name__ == "__main__":
+    main()
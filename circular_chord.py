@@ -1,11 +1,17 @@
 import pandas as pd
 import networkx as nx
-import community as community_louvain
 from collections import defaultdict
 import holoviews as hv
 from holoviews import opts, dim
 import matplotlib.pyplot as plt
 import os
+import corpus
+from gen_net import generate_undirected_graph, detect_communities
+from backbone import backbone_edges
+
+DATA_DIR = r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\newdata"
+# 弦图最多绘制的边数（超出时只保留骨干边）
+MAX_CHORD_EDGES = 200
 
 # 启用bokeh后端
 hv.extension('bokeh')
@@ -16,12 +22,10 @@ def process_data(file_path):
     df = pd.read_csv(file_path)
 
     # 创建无向图
-    G = nx.Graph()
-    for _, row in df.iterrows():
-        G.add_edge(row["Entity1"], row["Entity2"], weight=row["CoOccurrence"])
+    G = generate_undirected_graph(df)
 
     # 社区检测 (Louvain算法)
-    partition = community_louvain.best_partition(G, weight='weight')
+    partition = detect_communities(G)
 
     # 将社区信息添加到原始数据
     df['Community1'] = df['Entity1'].map(partition)
@@ -31,11 +35,12 @@ def process_data(file_path):
 
 
 # 2. 使用holoviews绘制弦图
-def plot_chord_diagram(df, title):
-    # 准备数据：源节点、目标节点、权重
-    sources = df['Entity1'].tolist()
-    targets = df['Entity2'].tolist()
-    values = df['CoOccurrence'].tolist()
+def plot_chord_diagram(df, title, max_edges=MAX_CHORD_EDGES):
+    # 准备数据：源节点、目标节点、权重（边数不超过 max_edges 时全画，超出时按 disparity p 值保留最显著的边）
+    edges = backbone_edges(df, method='disparity', alpha=None, max_edges=max_edges)
+    sources = edges['Entity1'].tolist()
+    targets = edges['Entity2'].tolist()
+    values = edges['CoOccurrence'].tolist()
 
     # 创建Chord对象
     chord = hv.Chord((sources, targets, values))
@@ -62,7 +67,7 @@ def analyze_community_trends(years):
     community_data = []
 
     for year in years:
-        file_path = f"C:/Users/w1782/Desktop/大一下作业/数据可视化作业/dataset/newdata/{year}_matrix_article.csv"
+        file_path = os.path.join(DATA_DIR, f"{year}_matrix_article.csv")
         df, G, partition = process_data(file_path)
 
         # 统计社区大小
@@ -75,7 +80,7 @@ def analyze_community_trends(years):
         community_data.append({f"Community {k}": v for k, v in sorted_comms})
 
     # 转换为DataFrame
-    df_trend = pd.DataFrame(community_data, index=[f"20{y[:2]}-20{y[2:]}" for y in years])
+    df_trend = pd.DataFrame(community_data, index=[corpus.period_label(y) for y in years])
     df_trend = df_trend.fillna(0)
 
     # 绘制趋势图
@@ -104,7 +109,7 @@ if __name__ == "__main__":
     display(chord)  # 在Jupyter中显示
 
     # 2. 分析四年社区变化趋势
-    years = ['2122', '2223', '2324', '2425']
+    years = corpus.discover_periods(DATA_DIR)
     trend_fig, df_trend = analyze_community_trends(years)
     plt.show()
 
@@ -0,0 +1,474 @@
+import os
+import json
+import argparse
+import functools
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import corpus
+
+# 稀疏共现存储: 每个年份一个CSR切片 (indptr/indices/data 三个 .npy 文件)，另存一个全部年份的合计切片
+STORE_DIR = os.path.join(corpus.CACHE_DIR, 'cooc')
+ALL_YEARS = 'all'
+
+# 进程内已打开的切片: 名称 -> CSR 视图
+_views = {}
+# 进程内的对称行索引: 名称 -> 对称 CSR（第i行即实体i的全部共现伙伴）
+_rows = {}
+
+# 每个切片为每个实体预先排好的共现伙伴数（neighbors 的 k 不超过它时直接读取）
+TOP_PARTNERS = 32
+# 查询结果的 LRU 缓存大小
+QUERY_CACHE_SIZE = 1024
+# 本进程是否已经检查过源文件更新
+_checked = False
+
+# 一个时期的源文件（含分片）超过这个大小时，compile_store 默认改用流式聚合
+STREAM_MIN_BYTES = 512 << 20
+
+MATRIX_COLUMNS = ['Entity1', 'Entity2', 'CoOccurrence']
+WORD_FREQ_COLUMNS = ['word', 'frequency']
+
+
+def _slice_path(name, part):
+    return os.path.join(STORE_DIR, f'{name}.{part}.npy')
+
+
+def _meta_path():
+    return os.path.join(STORE_DIR, 'store.json')
+
+
+def _read_meta():
+    if not os.path.exists(_meta_path()):
+        return {'years': [], 'sources': {}}
+    with open(_meta_path(), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _replace(path, write, binary=False):
+    # 先写临时文件再原子替换: 并行的进程读到的要么是旧文件要么是新文件，不会是写了一半的
+    tmp_path = path + f'.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb' if binary else 'w', encoding=None if binary else 'utf-8') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _write_meta(meta):
+    _replace(_meta_path(), lambda f: json.dump(meta, f))
+
+
+def _save(path, values):
+    _replace(path, lambda f: np.save(f, values), binary=True)
+
+
+def _signature(year):
+    return corpus.source_signature(corpus.period_sources(year))
+
+
+def _has_slice(name):
+    return all(os.path.exists(_slice_path(name, part)) for part in ('indptr', 'indices', 'data'))
+
+
+def canonical_csr(rows, cols, values, n):
+    """Build an upper-triangular CSR matrix: (a, b) and (b, a) are merged and duplicates summed"""
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    lo, hi = np.minimum(rows, cols), np.maximum(rows, cols)
+    m = sp.coo_matrix((np.asarray(values, dtype=np.int64), (lo, hi)), shape=(n, n)).tocsr()
+    m.sum_duplicates()
+    m.eliminate_zeros()
+    return m
+
+
+def _frame_csr(df, n):
+    return canonical_csr(df['Entity1_code'], df['Entity2_code'], df['CoOccurrence'], n)
+
+
+def _frame_word_freq(df, n):
+    return np.bincount(df['word_code'], weights=df['frequency'], minlength=n).astype(np.int64)
+
+
+def _merge_parts(total, parts, n):
+    # 已合并的结果和待合并的各块拼成一个COO，一次去重求和
+    parts = [total.tocoo()] + [part.tocoo() for part in parts]
+    return canonical_csr(np.concatenate([part.row for part in parts]),
+                         np.concatenate([part.col for part in parts]),
+                         np.concatenate([part.data for part in parts]), n)
+
+
+def _stream_csr(year, chunk_bytes):
+    """Aggregate a period's matrix shards chunk by chunk
+
+    Each chunk is reduced to its distinct pairs; the reduced chunks are merged into the running
+    total only once they hold at least as many entries as the total, so every entry is re-merged
+    a bounded number of times and peak memory stays within a small multiple of the distinct pairs.
+    """
+    n = len(corpus.vocabulary())
+    total = sp.csr_matrix((n, n), dtype=np.int64)
+    pending, pending_nnz = [], 0
+    for chunk in corpus.iter_csv_chunks(corpus.matrix_shards(year), MATRIX_COLUMNS, chunk_bytes):
+        rows = corpus.encode(chunk['Entity1'], persist=False)
+        cols = corpus.encode(chunk['Entity2'], persist=False)
+        n = len(corpus.vocabulary())
+        part = canonical_csr(rows, cols, chunk['CoOccurrence'], n)
+        pending.append(part)
+        pending_nnz += part.nnz
+        if pending_nnz >= total.nnz:
+            total = _merge_parts(total, pending, n)
+            pending, pending_nnz = [], 0
+    corpus.save_vocabulary()
+    return _merge_parts(total, pending, len(corpus.vocabulary()))
+
+
+def _stream_word_freq(year, chunk_bytes):
+    freq = np.zeros(0, dtype=np.int64)
+    for chunk in corpus.iter_csv_chunks(corpus.word_freq_shards(year), WORD_FREQ_COLUMNS, chunk_bytes):
+        codes = corpus.encode(chunk['word'], persist=False)
+        n = len(corpus.vocabulary())
+        freq = np.pad(freq, (0, n - len(freq)))
+        freq += np.bincount(codes, weights=chunk['frequency'], minlength=n).astype(np.int64)
+    corpus.save_vocabulary()
+    return freq
+
+
+def _read_shards(paths, kind):
+    """All shards of one period loaded through the corpus cache and stacked (None if there are none)"""
+    frames = [corpus.read_table(path, corpus.CODE_COLUMNS[kind]) for path in paths]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+def _load_csr(year):
+    matrix = _read_shards(corpus.matrix_shards(year), 'matrix')
+    n = len(corpus.vocabulary())
+    if matrix is None:
+        return sp.csr_matrix((n, n), dtype=np.int64)
+    return _frame_csr(matrix, n)
+
+
+def _load_word_freq(year):
+    word_freq = _read_shards(corpus.word_freq_shards(year), 'word_freq')
+    n = len(corpus.vocabulary())
+    if word_freq is None:
+        return np.zeros(n, dtype=np.int64)
+    return _frame_word_freq(word_freq, n)
+
+
+def _source_bytes(year):
+    return sum(os.path.getsize(path) for path in corpus.period_sources(year))
+
+
+def _write_slice(name, m):
+    index_dtype = np.int32 if max(m.shape[0], m.nnz) < np.iinfo(np.int32).max else np.int64
+    _save(_slice_path(name, 'indptr'), m.indptr.astype(index_dtype))
+    _save(_slice_path(name, 'indices'), m.indices.astype(index_dtype))
+    _save(_slice_path(name, 'data'), m.data.astype(np.int64))
+    _write_top(name, m)
+    _write_pair_order(name, m)
+    _views.pop(name, None)
+    _rows.pop(name, None)
+    clear_query_cache()
+
+
+def _load_slice(name, n=None):
+    """Open a stored slice as a memory-mapped CSR matrix (no copy of indices or data)"""
+    indptr = np.load(_slice_path(name, 'indptr'), mmap_mode='r')
+    indices = np.load(_slice_path(name, 'indices'), mmap_mode='r')
+    data = np.load(_slice_path(name, 'data'), mmap_mode='r')
+
+    stored_n = len(indptr) - 1
+    n = max(n or stored_n, stored_n)
+    if n > stored_n:
+        # 词表在该切片编译后增长了: 只补齐 indptr，indices/data 仍然是零拷贝
+        indptr = np.concatenate([indptr, np.full(n - stored_n, indptr[-1], dtype=indptr.dtype)])
+    m = sp.csr_matrix((n, n), dtype=data.dtype)
+    m.data, m.indices, m.indptr = data, indices, indptr
+    return m
+
+
+def uses_streaming(year, streaming=None):
+    """Whether compile_store reads this period in chunks (streaming=None: only when its sources exceed STREAM_MIN_BYTES)"""
+    return streaming if streaming is not None else _source_bytes(year) > STREAM_MIN_BYTES
+
+
+def compile_store(years=None, force=False, streaming=None, chunk_bytes=corpus.STREAM_CHUNK_BYTES):
+    """Compile the matrix and t_f CSVs (every shard) into the on-disk sparse store, recompiling only changed years
+
+    streaming=True reads the shards of a period in chunks of chunk_bytes and aggregates as it goes,
+    for exports larger than memory; streaming=False loads whole files through the corpus cache.
+    The default picks streaming for periods whose source files exceed STREAM_MIN_BYTES.
+    """
+    years = list(years or corpus.periods())
+    os.makedirs(STORE_DIR, exist_ok=True)
+    meta = _read_meta()
+
+    # 切片以编码保存: 词表被重置或重建后，所有切片都要按新编码重新编译
+    vocabulary_ok = corpus.vocabulary_unchanged(meta.get('vocabulary'))
+    stale = [year for year in years
+             if force or not vocabulary_ok or not _has_slice(year) or not os.path.exists(_slice_path(year, 'freq'))
+             or meta['sources'].get(year) != _signature(year)]
+
+    for year in stale:
+        if uses_streaming(year, streaming):
+            m = _stream_csr(year, chunk_bytes)
+            freq = _stream_word_freq(year, chunk_bytes)
+        else:
+            m = _load_csr(year)
+            freq = _load_word_freq(year)
+        _write_slice(year, m)
+        _save(_slice_path(year, 'freq'), freq)
+        meta['sources'][year] = _signature(year)
+
+    # 没有重建任何切片时不改写 store.json（每个进程首次访问都会走到这里）
+    if stale or meta['years'] != years or not _has_slice(ALL_YEARS):
+        n = len(corpus.vocabulary())
+        total = sp.csr_matrix((n, n), dtype=np.int64)
+        for year in years:
+            total = total + _load_slice(year, n)
+        _write_slice(ALL_YEARS, total.tocsr())
+        meta['years'] = years
+        meta['vocabulary'] = corpus.vocabulary_signature()
+        _write_meta(meta)
+    global _checked
+    _checked = True
+
+
+def _ensure_compiled():
+    if not _checked:
+        # 每个进程首次访问时检查源文件是否有更新
+        compile_store()
+
+
+def year_matrix(year):
+    """Return the canonical (upper-triangular) co-occurrence CSR for one year"""
+    _ensure_compiled()
+    if year not in _views:
+        _views[year] = _load_slice(year, len(corpus.vocabulary()))
+    return _views[year]
+
+
+def word_frequencies(year):
+    """Per-code word frequency vector of one year (codes past its end have frequency 0)"""
+    _ensure_compiled()
+    return np.load(_slice_path(year, 'freq'), mmap_mode='r')
+
+
+def all_years_matrix():
+    """Return the canonical co-occurrence CSR summed over every compiled year"""
+    return year_matrix(ALL_YEARS)
+
+
+def symmetric(m):
+    """Expand a canonical upper-triangular matrix into the full symmetric adjacency"""
+    return (m + sp.triu(m, k=1).T).tocsr()
+
+
+def active_codes(m):
+    """Entity codes that have at least one nonzero in the matrix"""
+    m = m.tocoo()
+    return np.union1d(m.row, m.col).astype(np.int32)
+
+
+# ---- 查询层: 按实体查共现伙伴 / 词对时间序列 / 自我中心网络 ----
+
+def _top_index(m, k):
+    # 对称矩阵每行按共现次数降序（相同时编码小的在前）取前k个非自身伙伴，仍以CSR布局保存
+    s = symmetric(m).tocoo()
+    off_diagonal = s.row != s.col
+    row, col, data = s.row[off_diagonal], s.col[off_diagonal], s.data[off_diagonal]
+    order = np.lexsort((col, -data, row))
+    row, col, data = row[order], col[order], data[order]
+    rank = np.arange(len(row)) - np.searchsorted(row, row, side='left')
+    keep = rank < k
+    counts = np.bincount(row[keep], minlength=m.shape[0])
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    return indptr, col[keep], data[keep]
+
+
+def _write_top(name, m):
+    for part, values in zip(('top_indptr', 'top_indices', 'top_data'), _top_index(m, TOP_PARTNERS)):
+        _save(_slice_path(name, part), values)
+
+
+def _load_derived(name, parts, build):
+    paths = [_slice_path(name, part) for part in parts]
+    if not all(os.path.exists(path) for path in paths) \
+            or os.path.getmtime(paths[0]) < os.path.getmtime(_slice_path(name, 'indptr')):
+        # 旧版本编译的存储没有这个索引，补建一次
+        build(name, year_matrix(name))
+    return [np.load(path, mmap_mode='r') for path in paths]
+
+
+def _load_top(name):
+    return _load_derived(name, ('top_indptr', 'top_indices', 'top_data'), _write_top)
+
+
+def _write_pair_order(name, m):
+    # 非零元素按共现次数降序的位置（相同时保持行优先顺序），以及排好序的共现次数
+    order = np.argsort(-np.asarray(m.data), kind='stable')
+    _save(_slice_path(name, 'pair_order'), order)
+    _save(_slice_path(name, 'pair_weight'), np.asarray(m.data)[order])
+
+
+def _row_index(name):
+    if name not in _rows:
+        _rows[name] = symmetric(year_matrix(name))
+    return _rows[name]
+
+
+def _code(entity):
+    # 先编译（可能重建词表），再查编码；词表中没有的实体返回 None
+    _ensure_compiled()
+    code = corpus.lookup([entity])[0]
+    return int(code) if code >= 0 else None
+
+
+def clear_query_cache():
+    _neighbor_codes.cache_clear()
+    _pair_values.cache_clear()
+    _ego_codes.cache_clear()
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _neighbor_codes(code, name, k):
+    _ensure_compiled()
+    if k is not None and k <= TOP_PARTNERS:
+        indptr, indices, data = _load_top(name)
+        if code + 1 >= len(indptr):
+            return (), ()
+        start, stop = indptr[code], min(indptr[code + 1], indptr[code] + k)
+        return tuple(indices[start:stop].tolist()), tuple(data[start:stop].tolist())
+
+    rows = _row_index(name)
+    start, stop = rows.indptr[code], rows.indptr[code + 1]
+    cols, data = np.asarray(rows.indices[start:stop]), np.asarray(rows.data[start:stop])
+    other = cols != code
+    cols, data = cols[other], data[other]
+    order = np.lexsort((cols, -data))[:k]
+    return tuple(cols[order].tolist()), tuple(data[order].tolist())
+
+
+def neighbors(entity, year=None, k=10):
+    """
+    与 entity 共现最多的k个实体（不含自身），按共现次数降序
+    参数:
+        year: 年份；None 表示全部年份合计
+        k: 伙伴数；None 表示全部
+    返回:
+        DataFrame: Entity, Entity_code, CoOccurrence；词表中没有 entity 时为空表
+    """
+    code = _code(entity)
+    codes, weights = ((), ()) if code is None else _neighbor_codes(code, ALL_YEARS if year is None else year, k)
+    codes = np.array(codes, dtype=np.int32)
+    return pd.DataFrame({
+        'Entity': corpus.decode(codes),
+        'Entity_code': codes,
+        'CoOccurrence': np.array(weights, dtype=np.int64)
+    })
+
+
+def pairs(year=None, threshold=None, k=None, by_year=False):
+    """
+    词对查询，只访问非零元素，不生成稠密矩阵
+    参数:
+        year: 年份；None 表示全部年份合计
+        threshold: 只保留共现次数大于 threshold 的词对
+        k: 只保留共现次数最大的k个词对
+        by_year: 为选出的词对附加每个年份的共现次数（列名为年份）
+    返回:
+        DataFrame: Entity1, Entity2, Entity1_code, Entity2_code, CoOccurrence，按共现次数降序；
+        无向词对只出现一次 (Entity1_code <= Entity2_code)
+    """
+    _ensure_compiled()
+    name = ALL_YEARS if year is None else year
+    m = year_matrix(name)
+    order, weight = _load_derived(name, ('pair_order', 'pair_weight'), _write_pair_order)
+
+    count = len(weight)
+    if threshold is not None:
+        # weight 降序，反转后二分查找
+        count = len(weight) - np.searchsorted(weight[::-1], threshold, side='right')
+    if k is not None:
+        count = min(count, k)
+    selected = np.asarray(order[:count])
+    rows = (np.searchsorted(m.indptr, selected, side='right') - 1).astype(np.int32)
+    cols = np.asarray(m.indices[selected]).astype(np.int32)
+
+    table = pd.DataFrame({
+        'Entity1': corpus.decode(rows),
+        'Entity2': corpus.decode(cols),
+        'Entity1_code': rows,
+        'Entity2_code': cols,
+        'CoOccurrence': np.asarray(weight[:count])
+    })
+    if by_year:
+        for period in corpus.periods():
+            table[period] = np.asarray(year_matrix(period)[rows, cols]).ravel() if count else []
+    return table
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _pair_values(a, b):
+    _ensure_compiled()
+    lo, hi = min(a, b), max(a, b)
+    return tuple(int(year_matrix(year)[lo, hi]) for year in corpus.periods())
+
+
+def pair_series(a, b):
+    """实体 a 与 b 每个年份的共现次数: Series 年份 -> 共现次数（任一实体不在词表中时全为0）"""
+    a, b = _code(a), _code(b)
+    values = _pair_values(a, b) if a is not None and b is not None else (0,) * len(corpus.periods())
+    return pd.Series(values, index=corpus.periods(), name='CoOccurrence', dtype='int64')
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _ego_codes(code, depth, name, k):
+    nodes = {code}
+    frontier = [code]
+    for _ in range(depth):
+        reached = set()
+        for node in frontier:
+            reached.update(_neighbor_codes(node, name, k)[0])
+        frontier = sorted(reached - nodes)
+        nodes.update(frontier)
+    return tuple(sorted(nodes))
+
+
+def ego_graph(entity, depth=1, year=None, k=None):
+    """
+    以 entity 为中心、depth 步以内的共现网络（包含这些节点之间的全部边）
+    参数:
+        year: 年份；None 表示全部年份合计
+        k: 每一步只沿每个节点的前k个伙伴扩展；None 表示全部伙伴
+    返回:
+        networkx.Graph，节点为实体名，边属性 weight 为共现次数；词表中没有 entity 时为空图
+    """
+    import networkx as nx
+
+    code = _code(entity)
+    if code is None:
+        return nx.Graph()
+    name = ALL_YEARS if year is None else year
+    codes = np.array(_ego_codes(code, depth, name, k), dtype=np.int64)
+    sub = sp.triu(_row_index(name)[codes][:, codes]).tocoo()
+    labels = corpus.decode(codes)
+    G = nx.Graph()
+    G.add_nodes_from(labels)
+    G.add_weighted_edges_from(zip(labels[sub.row], labels[sub.col], sub.data.tolist()))
+    return G
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile the co-occurrence CSVs into the sparse store')
+    parser.add_argument('years', nargs='*', help='periods to compile (default: all)')
+    parser.add_argument('--force', action='store_true', help='recompile even if the sources are unchanged')
+    parser.add_argument('--streaming', action=argparse.BooleanOptionalAction, default=None,
+                        help=f'aggregate the CSVs chunk by chunk (default: only for periods over '
+                             f'{STREAM_MIN_BYTES >> 20} MB)')
+    parser.add_argument('--chunk-mb', type=int, default=corpus.STREAM_CHUNK_BYTES >> 20,
+                        help='chunk size for streaming, in MB')
+    args = parser.parse_args(argv)
+    compile_store(args.years or None, force=args.force, streaming=args.streaming, chunk_bytes=args.chunk_mb << 20)
+
+
+if __name__ == "__main__":
+    main()
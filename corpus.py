@@ -0,0 +1,398 @@
+import os
+import re
+import json
+import pickle
+import glob
+import hashlib
+import numpy as np
+import pandas as pd
+
+# 数据目录与派生缓存目录（缓存放在CSV旁边）
+DATA_DIR = 'data'
+CACHE_DIR = os.path.join(DATA_DIR, '.cache')
+MANIFEST = 'manifest.json'
+
+# 数据文件名: {period}_matrix_article.csv / {period}_t_f.csv，period 形如 '2122'
+# 大文件可以拆成分片，例如 2122_matrix_article.part-0001.csv
+_PERIOD_FILE = re.compile(r'^(\d{4})_(?:matrix_article|t_f)(?:\.[\w-]+)?\.csv$')
+
+# 流式读取时每块的大小（字节）
+STREAM_CHUNK_BYTES = 64 << 20
+
+# 进程内缓存: 绝对路径（多个分片时为路径元组） -> ((mtime_ns, size), DataFrame)
+_frames = {}
+
+# 需要编码的词语列，编码列名为 f'{column}_code'
+CODE_COLUMNS = {
+    'matrix': ['Entity1', 'Entity2'],
+    'word_freq': ['word'],
+    'entity_dict': ['entity'],
+}
+# 词语列总是按字符串读取（'2000' 之类的实体不能被推断成整数）
+TEXT_COLUMNS = sorted({column for columns in CODE_COLUMNS.values() for column in columns})
+
+# 全语料共享的词表: 词语 -> int32 编码，只追加不重排，保证编码跨年份、跨运行稳定
+_vocab = None
+# 词表前缀的哈希: 前缀长度 -> sha1（词表只追加，已算过的前缀不会变）
+_vocab_digests = {}
+# (词表, 以词表为类别的 CategoricalDtype)，词表增长后重建
+_label_dtype = None
+
+
+def _has_parquet():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _file_hash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_json(path, value):
+    # 写临时文件再原子替换，并行的进程不会读到写了一半的文件
+    tmp_path = path + f'.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+
+
+def _cache_paths(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    cache_dir = os.path.join(os.path.dirname(path), '.cache')
+    return os.path.join(cache_dir, f'{name}.parquet'), os.path.join(cache_dir, f'{name}.json')
+
+
+def _read_parquet_copy(path, stat):
+    """Return the typed Parquet copy of a CSV if it is still valid, else None"""
+    parquet_path, meta_path = _cache_paths(path)
+    if not (os.path.exists(parquet_path) and os.path.exists(meta_path)):
+        return None
+    with open(meta_path, encoding='utf-8') as f:
+        meta = json.load(f)
+
+    if meta.get('mtime_ns') != stat.st_mtime_ns or meta.get('size') != stat.st_size:
+        # 文件被touch过但内容可能没变，用哈希确认
+        if meta.get('sha1') != _file_hash(path):
+            return None
+        meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        _write_json(meta_path, meta)
+    return pd.read_parquet(parquet_path)
+
+
+def _write_parquet_copy(path, stat, df):
+    parquet_path, meta_path = _cache_paths(path)
+    try:
+        os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+        tmp_path = parquet_path + f'.{os.getpid()}.tmp'
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, parquet_path)
+        _write_json(meta_path, {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': _file_hash(path)})
+    except OSError as e:
+        # 缓存只是加速手段，写失败不影响结果
+        print(f"警告: 无法写入缓存 {parquet_path}: {e}")
+
+
+def _vocab_path():
+    return os.path.join(CACHE_DIR, 'vocabulary.json')
+
+
+def vocabulary():
+    """Return the corpus-wide entity dictionary as a pandas Index (position = code)"""
+    global _vocab
+    if _vocab is None:
+        terms = []
+        if os.path.exists(_vocab_path()):
+            with open(_vocab_path(), encoding='utf-8') as f:
+                terms = json.load(f)
+        _vocab = pd.Index(terms, dtype=object)
+    return _vocab
+
+
+def _save_vocabulary(vocab):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = _vocab_path() + f'.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(vocab.tolist(), f, ensure_ascii=False)
+    os.replace(tmp_path, _vocab_path())
+
+
+def save_vocabulary():
+    _save_vocabulary(vocabulary())
+
+
+def vocabulary_signature(size=None):
+    """[size, sha1] of the first size terms of the dictionary (all of it by default), or None if it is shorter
+
+    Anything stored as codes stays decodable exactly as long as the dictionary prefix it was built
+    with is unchanged; a reset or rebuilt vocabulary.json changes the prefix digest.
+    """
+    vocab = vocabulary()
+    size = len(vocab) if size is None else size
+    if size > len(vocab):
+        return None
+    if size not in _vocab_digests:
+        _vocab_digests[size] = hashlib.sha1('\0'.join(vocab[:size]).encode('utf-8')).hexdigest()
+    return [size, _vocab_digests[size]]
+
+
+def vocabulary_unchanged(signature):
+    """True if the dictionary still starts with the terms recorded by vocabulary_signature()"""
+    return signature is not None and vocabulary_signature(signature[0]) == list(signature)
+
+
+def encode(values, persist=True):
+    """Map terms to int32 codes, registering unseen terms at the end of the dictionary
+
+    With persist=False new terms are only kept in memory; call save_vocabulary() afterwards.
+    """
+    global _vocab
+    values = pd.Series(values, dtype=object).astype(str)
+    vocab = vocabulary()
+    codes = vocab.get_indexer(values)
+    if (codes < 0).any():
+        new_terms = pd.unique(values[codes < 0])
+        _vocab = vocab.append(pd.Index(new_terms, dtype=object))
+        if persist:
+            _save_vocabulary(_vocab)
+        codes = _vocab.get_indexer(values)
+    return codes.astype(np.int32)
+
+
+def lookup(values):
+    """Map terms to int32 codes without registering them; unknown terms become -1"""
+    values = pd.Series(values, dtype=object).astype(str)
+    return vocabulary().get_indexer(values).astype(np.int32)
+
+
+def decode(codes):
+    """Map int32 codes back to term labels"""
+    return vocabulary().take(np.asarray(codes, dtype=np.int64)).to_numpy()
+
+
+def label_dtype():
+    """CategoricalDtype whose categories are the dictionary, so a label's category code is its entity code"""
+    global _label_dtype
+    vocab = vocabulary()
+    if _label_dtype is None or _label_dtype[0] is not vocab:
+        _label_dtype = (vocab, pd.CategoricalDtype(vocab))
+    return _label_dtype[1]
+
+
+def file_digest(path):
+    """SHA-1 of a source file, reusing the digest recorded beside its Parquet copy while still valid"""
+    stat = os.stat(path)
+    _, meta_path = _cache_paths(path)
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+            return meta['sha1']
+    return _file_hash(path)
+
+
+def _add_codes(df, code_columns):
+    # 先给所有列编码（可能扩充词表），再用同一个 dtype 把标签列换成 Categorical，两列的类别一致可以直接比较
+    for column in code_columns:
+        if f'{column}_code' not in df:
+            df[f'{column}_code'] = encode(df[column])
+    for column in code_columns:
+        if not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = pd.Categorical.from_codes(df[f'{column}_code'], dtype=label_dtype())
+    return df
+
+
+def read_table(path, code_columns=()):
+    """Read a CSV once per process, backed by a typed Parquet copy on disk
+
+    Each column in code_columns gets an int32 companion column f'{column}_code'
+    holding its corpus-wide entity code, and the column itself is stored as a Categorical over the
+    dictionary (see label_dtype), so the labels cost one code per row instead of one string object;
+    a frame cached without some of them gets them added.
+    """
+    key = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    hit = _frames.get(key)
+    if hit is not None and hit[0] == signature:
+        df = hit[1]
+    else:
+        use_parquet = _has_parquet()
+        df = _read_parquet_copy(path, stat) if use_parquet else None
+        if df is None:
+            df = pd.read_csv(path, dtype={column: str for column in TEXT_COLUMNS})
+            if use_parquet:
+                _write_parquet_copy(path, stat, df)
+        _frames[key] = (signature, df)
+    return _add_codes(df, code_columns)
+
+
+def read_tables(paths, code_columns=()):
+    """Read the shards of one table through read_table and stack them (a single file is returned as is)"""
+    paths = list(paths)
+    if len(paths) == 1:
+        return read_table(paths[0], code_columns)
+
+    key = tuple(os.path.abspath(path) for path in paths)
+    signature = tuple((stat.st_mtime_ns, stat.st_size) for stat in map(os.stat, paths))
+    hit = _frames.get(key)
+    if hit is not None and hit[0] == signature:
+        df = hit[1]
+    else:
+        df = pd.concat([read_table(path, code_columns) for path in paths], ignore_index=True)
+        _frames[key] = (signature, df)
+    # 分片的标签列类别不同（编码时词表长度不同）时，拼接后是普通字符串列，由 _add_codes 重新换成 Categorical
+    return _add_codes(df, code_columns)
+
+
+def clear_cache():
+    """Drop every in-memory frame and the in-memory dictionary (on-disk copies are kept)"""
+    global _vocab, _label_dtype
+    _frames.clear()
+    _vocab_digests.clear()
+    _vocab = None
+    _label_dtype = None
+
+
+def discover_periods(data_dir=None):
+    """Return the sorted period list, from data/manifest.json if present, else from the file names
+
+    manifest.json looks like {"periods": ["2122", "2223", ...]}.
+    """
+    data_dir = data_dir or DATA_DIR
+    manifest_path = os.path.join(data_dir, MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            return [str(p) for p in json.load(f)['periods']]
+
+    periods = set()
+    for name in os.listdir(data_dir):
+        match = _PERIOD_FILE.match(name)
+        if match:
+            periods.add(match.group(1))
+    return sorted(periods)
+
+
+def periods():
+    return discover_periods(DATA_DIR)
+
+
+def period_label(period):
+    """'2122' -> '2021-2022'"""
+    return f'20{period[:2]}-20{period[2:]}'
+
+
+def matrix_path(year):
+    return os.path.join(DATA_DIR, f'{year}_matrix_article.csv')
+
+
+def word_freq_path(year):
+    return os.path.join(DATA_DIR, f'{year}_t_f.csv')
+
+
+def matrix_shards(year):
+    """The matrix file of a period plus any {year}_matrix_article.<part>.csv shards"""
+    return sorted(glob.glob(os.path.join(DATA_DIR, f'{year}_matrix_article*.csv')))
+
+
+def word_freq_shards(year):
+    return sorted(glob.glob(os.path.join(DATA_DIR, f'{year}_t_f*.csv')))
+
+
+def period_sources(year):
+    """Every source file of a period: its matrix and t_f CSVs with their shards"""
+    return matrix_shards(year) + word_freq_shards(year)
+
+
+def iter_csv_chunks(paths, columns, chunk_bytes=STREAM_CHUNK_BYTES):
+    """Yield DataFrames of bounded size from one or more CSV files
+
+    Uses pyarrow's multi-threaded streaming reader when available, else pandas chunks.
+    Text columns are always read as strings; pyarrow would otherwise fix their type from the first block.
+    """
+    text_columns = [column for column in columns if column in TEXT_COLUMNS]
+    if _has_parquet():
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+        read_options = pa_csv.ReadOptions(block_size=chunk_bytes, use_threads=True)
+        convert_options = pa_csv.ConvertOptions(include_columns=columns,
+                                                column_types={column: pa.string() for column in text_columns})
+        for path in paths:
+            with pa_csv.open_csv(path, read_options=read_options, convert_options=convert_options) as reader:
+                for batch in reader:
+                    yield batch.to_pandas()
+    else:
+        # 按每行约64字节估算行数
+        rows = max(1, chunk_bytes // 64)
+        for path in paths:
+            yield from pd.read_csv(path, usecols=columns, chunksize=rows,
+                                   dtype={column: str for column in text_columns})
+
+
+def load_matrices(years=None):
+    """Return {year: co-occurrence DataFrame} (every shard of the period stacked); frames are shared, do not modify them in place"""
+    return {year: read_tables(matrix_shards(year) or [matrix_path(year)], CODE_COLUMNS['matrix'])
+            for year in (years or periods())}
+
+
+def load_word_freqs(years=None):
+    """Return {year: word frequency DataFrame} (every shard of the period stacked); frames are shared, do not modify them in place"""
+    return {year: read_tables(word_freq_shards(year) or [word_freq_path(year)], CODE_COLUMNS['word_freq'])
+            for year in (years or periods())}
+
+
+def load_entity_dict():
+    return read_table(os.path.join(DATA_DIR, 'entity_dict.csv'), CODE_COLUMNS['entity_dict'])
+
+
+def concat_years(frames, column='year'):
+    """Stack {year: DataFrame} into one frame with a year column"""
+    return pd.concat([df.assign(**{column: year}) for year, df in frames.items()], ignore_index=True)
+
+
+def source_signature(paths):
+    signature = []
+    for path in paths:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            signature.append([os.path.basename(path), stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def period_artifact(name, period, compute, sources=None, version=1, codes=False):
+    """Return a derived per-period artifact, recomputing it only when that period's inputs change
+
+    The result of compute() is pickled under data/.cache/artifacts/{name}/{period}.pkl together
+    with the signature of the period's source files (by default its matrix and t_f CSVs and their shards), so adding
+    a new period only computes the new period. Bump version when compute() changes meaning.
+    Pass codes=True when the value holds entity codes: it is then also invalidated when the
+    dictionary it was built with is reset or rebuilt.
+    """
+    sources = sources or period_sources(period)
+    signature = {'version': version, 'sources': source_signature(sources)}
+
+    artifact_dir = os.path.join(CACHE_DIR, 'artifacts', name)
+    artifact_path = os.path.join(artifact_dir, f'{period}.pkl')
+    if os.path.exists(artifact_path):
+        with open(artifact_path, 'rb') as f:
+            stored_signature, value = pickle.load(f)
+        stored_vocabulary = stored_signature.pop('vocabulary', None)
+        if stored_signature == signature and (not codes or vocabulary_unchanged(stored_vocabulary)):
+            return value
+
+    value = compute()
+    if codes:
+        signature['vocabulary'] = vocabulary_signature()
+    os.makedirs(artifact_dir, exist_ok=True)
+    tmp_path = artifact_path + f'.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump((signature, value), f)
+    os.replace(tmp_path, artifact_path)
+    return value
@@ -1,122 +1,147 @@
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
-from sklearn.preprocessing import MinMaxScaler
-from gen_net import generate_undirected_graph, detect_communities
+import time
+
+_IMPORT_START = time.perf_counter()
+
 import os
-from matplotlib.colors import to_hex
-import matplotlib.colors as mcolors
+import argparse
 import math
-import networkx as nx
-from matplotlib import cm
+import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.lines import Line2D
-from plotly.colors import qualitative
-from plotly.colors import hex_to_rgb
+import corpus
+
+# plotly / networkx / scipy / matplotlib / python-louvain 都比较重，只在需要它们的图表函数里导入
 
 
 def read_matrix_article():
-    """Read matrix file and return a pandas DataFrame"""
-    df = {}
-    years = ['2122', '2223', '2324', '2425']
-    for year in years:
-        file_path = f'data/{year}_matrix_article.csv'
-        df[year] = pd.read_csv(file_path)
-    return df
+    """Read matrix files and return {year: DataFrame} from the shared corpus cache"""
+    return corpus.load_matrices()
 
 def read_entity_dict():
-    df = pd.read_csv(r"data\entity_dict.csv")
-    return df
-
-def read_word_freq(file_path):
-    """Read word frequency file and return a pandas DataFrame"""
-    df = {}
-    years = ['2122', '2223', '2324', '2425']
-    for year in years:
-        file_path = f'data/{year}_t_f.csv'
-        df[year] = pd.read_csv(file_path)
+    return corpus.load_entity_dict()
 
-    return df
+def read_word_freq(file_path=None):
+    """Read word frequency files and return {year: DataFrame} from the shared corpus cache"""
+    return corpus.load_word_freqs()
 
 # def load_map_json():
 
 
 def load_map_location():
-    changjiang_delta_places = {
-        '上海': [['上海', '上海市'], 121.47, 31.23],
-        '江苏': [['江苏', '江苏省'], 118.78, 32.07],
-        '浙江': [['浙江', '浙江省'], 120.15, 30.28],
-        '安徽': [['安徽', '安徽省'], 117.28, 31.86],
-        '南京': [['南京', '南京市'], 118.78, 32.07],
-        '苏州': [['苏州', '苏州市'], 120.62, 31.32],
-        '杭州': [['杭州', '杭州市'], 120.15, 30.28],
-        '合肥': [['合肥', '合肥市'], 117.28, 31.86],
-        '宁波': [['宁波', '宁波市'], 121.55, 29.88],
-        '无锡': [['无锡', '无锡市'], 120.30, 31.57],
-        '常州': [['常州', '常州市'], 119.95, 31.78],
-        '南通': [['南通', '南通市'], 120.86, 32.01],
-        '扬州': [['扬州', '扬州市'], 119.42, 32.39],
-        '镇江': [['镇江', '镇江市'], 119.45, 32.20],
-        '泰州': [['泰州', '泰州市'], 119.90, 32.49],
-        '盐城': [['盐城', '盐城市'], 120.15, 33.35],
-        '淮安': [['淮安', '淮安市'], 119.02, 33.62],
-        '宿迁': [['宿迁', '宿迁市'], 118.28, 33.96],
-        '徐州': [['徐州', '徐州市'], 117.18, 34.26],
-        '连云港': [['连云港', '连云港市'], 119.16, 34.59],
-        '温州': [['温州', '温州市'], 120.70, 28.00],
-        '绍兴': [['绍兴', '绍兴市'], 120.58, 30.01],
-        '湖州': [['湖州', '湖州市'], 120.09, 30.89],
-        '嘉兴': [['嘉兴', '嘉兴市'], 120.76, 30.77],
-        '金华': [['金华', '金华市'], 119.65, 29.08],
-        '衢州': [['衢州', '衢州市'], 118.87, 28.94],
-        '台州': [['台州', '台州市'], 121.42, 28.66],
-        '丽水': [['丽水', '丽水市'], 119.92, 28.45],
-        '舟山': [['舟山', '舟山市'], 122.20, 30.00],
-        '芜湖': [['芜湖', '芜湖市'], 118.38, 31.33],
-        '马鞍山': [['马鞍山', '马鞍山市'], 118.51, 31.70],
-        '铜陵': [['铜陵', '铜陵市'], 117.82, 30.94],
-        '安庆': [['安庆', '安庆市'], 117.07, 30.52],
-        '滁州': [['滁州', '滁州市'], 118.32, 32.30],
-        '池州': [['池州', '池州市'], 117.49, 30.67],
-        '宣城': [['宣城', '宣城市'], 118.76, 30.95],
-        '松江': [['松江', '松江区'], 121.23, 31.03],
-        '虹桥': [['虹桥'], 121.38, 31.20],
-        '张江': [['张江'], 121.58, 31.20],
-        '临港': [['临港'], 121.88, 30.90],
-        '昆山': [['昆山', '昆山市'], 120.95, 31.39],
-        '嘉善': [['嘉善', '嘉善县'], 120.92, 30.84],
-        '嘉兴港区': [['嘉兴港区'], 121.10, 30.60],
-        '杭州湾': [['杭州湾'], 121.15, 30.30],
-        '金华经开区': [['金华经开区'], 119.65, 29.08],
-        '合肥高新区': [['合肥高新区'], 117.20, 31.80],
-        '苏州工业园': [['苏州工业园', '苏州工业园区'], 120.70, 31.32]
-    }
-    return changjiang_delta_places
+    """The shared gazetteer {place: [[variants], lon, lat]}"""
+    from gazetteer import PLACES
+    return PLACES
+
+
+# 共现热力图最多展示的实体数（按共现总量取前N个）
+HEATMAP_MAX_ENTITIES = 200
+
+# 地图的地名范围: 长三角地图取经纬度范围内的地名，上海地图取上海市中心周边、属于上海的地名
+CHANGJIANG_BBOX = (114.8, 27.0, 123.0, 35.2)
+SHANGHAI_RADIUS_KM = 55
+
+def yearly_partition(year):
+    """Consensus Louvain partition of one period's co-occurrence graph, reused until that period's data changes
+
+    Runs as a pipeline stage, which is already a worker process, so the consensus runs stay serial.
+    """
+    from gen_net import generate_undirected_graph, detect_communities, CONSENSUS_RUNS
+    return corpus.period_artifact(
+        'partition', year,
+        lambda: detect_communities(generate_undirected_graph(corpus.load_matrices([year])[year]),
+                                   runs=CONSENSUS_RUNS, max_workers=1),
+        version=2)
+
+
+def yearly_temporal_partition(year):
+    """(partition, next_id) of one period warm-started from the previous period, with community IDs carried forward
+
+    Depends on every earlier period, so it is recomputed when any of their matrices change.
+    """
+    from gen_net import generate_undirected_graph, temporal_communities
+
+    years = corpus.periods()
+    earlier = years[:years.index(year)]
+
+    def compute():
+        previous, next_id = yearly_temporal_partition(earlier[-1]) if earlier else (None, None)
+        G = generate_undirected_graph(corpus.load_matrices([year])[year])
+        return temporal_communities(G, previous, next_id, max_workers=1)
+
+    return corpus.period_artifact(
+        'temporal_partition', year, compute,
+        sources=[path for period in earlier + [year] for path in corpus.matrix_shards(period)])
+
+
+def yearly_entity_strength(year):
+    """Series entity code -> total co-occurrence of one period, reused until that period's data changes"""
+    from gen_net import entity_strength
+    return corpus.period_artifact(
+        'entity_strength', year,
+        lambda: entity_strength(corpus.load_matrices([year])[year], ('Entity1_code', 'Entity2_code')),
+        codes=True)
+
+
+def yearly_place_frequencies(year):
+    """Frequency of every gazetteer place in one period's word table (int array in PLACES order)
+
+    Reused until that period's word table or the gazetteer changes.
+    """
+    import gazetteer
+
+    def compute():
+        place_freq = gazetteer.place_frequencies(corpus.load_word_freqs([year])[year])
+        return (place_freq.set_index('place')['frequency']
+                .reindex(list(gazetteer.PLACES), fill_value=0)
+                .to_numpy(dtype=np.int64))
+
+    return corpus.period_artifact('place_freq', year, compute,
+                                  sources=corpus.word_freq_shards(year) + [gazetteer.__file__], version=4)
+
+
+def place_frequency_cube():
+    """(places, periods, counts): the place x period frequency cube shared by the line chart and the maps
+
+    places is the gazetteer DataFrame (place, longitude, latitude); counts[i, j] is the frequency of
+    place i in periods[j]. Each column is a cached per-period artifact, so only new periods are matched.
+    """
+    from gazetteer import coordinates
+
+    places = coordinates()
+    years = corpus.periods()
+    counts = np.zeros((len(places), len(years)), dtype=np.int64)
+    for j, year in enumerate(years):
+        counts[:, j] = yearly_place_frequencies(year)
+    return places, years, counts
+
+
+def place_totals(names=None):
+    """All-periods frequency of the gazetteer places (or only of names), places that never occur are dropped"""
+    places, _, counts = place_frequency_cube()
+    totals = places.assign(frequency=counts.sum(axis=1))
+    if names is not None:
+        totals = totals.set_index('place').loc[list(names)].reset_index()
+    return totals[totals['frequency'] > 0].reset_index(drop=True)
 
 
 def create_sankey_diagram():
     """Create animated Sankey diagram showing co-occurrence of entities over years"""
-    dataframes = read_matrix_article()  # Using the centralized data loading function
+    import plotly.graph_objects as go
+    import cooc
 
-    merged_data = pd.concat([df.assign(year=year) for year, df in dataframes.items()], ignore_index=True)
-    unique_entities = list(set(merged_data['Entity1']).union(set(merged_data['Entity2'])))
-    entity_to_index = {entity: idx for idx, entity in enumerate(unique_entities)}
+    years = corpus.periods()
+    # 节点顺序 = 出现过的实体编码排序后的位置
+    entity_codes = cooc.active_codes(cooc.all_years_matrix())
+    unique_entities = corpus.decode(entity_codes).tolist()
     frames = []
 
-    for year in dataframes.keys():  # Use the years from the loaded data
-        yearly_data = merged_data[merged_data['year'] == year]
-        source_indices = []
-        target_indices = []
-        values = []
+    def link_indices(year):
+        links = cooc.year_matrix(year).tocoo()
+        source_indices = np.searchsorted(entity_codes, links.row).tolist()
+        target_indices = np.searchsorted(entity_codes, links.col).tolist()
+        return source_indices, target_indices, links.data.tolist()
 
-        for index, row in yearly_data.iterrows():
-            source_idx = entity_to_index[row['Entity1']]
-            target_idx = entity_to_index[row['Entity2']]
-            source_indices.append(source_idx)
-            target_indices.append(target_idx)
-            values.append(row['CoOccurrence'])
+    for year in years:
+        source_indices, target_indices, values = link_indices(year)
 
         frame_data = go.Sankey(
             node=dict(
@@ -156,21 +181,13 @@ def create_sankey_diagram():
                 steps=[
                     dict(method='animate',
                          args=[[str(year)], {'frame': {'duration': 300, 'redraw': True}, 'mode': 'immediate'}],
-                         label=str(year)) for year in dataframes.keys()  # Use loaded years
+                         label=str(year)) for year in years
                 ]
             )
         ]
     )
 
-    initial_source_indices = []
-    initial_target_indices = []
-    initial_values = []
-
-    first_year = list(dataframes.keys())[0]  # Get first year from loaded data
-    for index, row in merged_data[merged_data['year'] == first_year].iterrows():
-        initial_source_indices.append(entity_to_index[row['Entity1']])
-        initial_target_indices.append(entity_to_index[row['Entity2']])
-        initial_values.append(row['CoOccurrence'])
+    initial_source_indices, initial_target_indices, initial_values = link_indices(years[0])
 
     initial_frame_data = go.Sankey(
         node=dict(
@@ -192,12 +209,10 @@ def create_sankey_diagram():
 
 def create_parallel_bar_chart():
     """Create parallel bar chart showing community detection in relationship networks"""
-    dataframes = read_matrix_article()  # Using the centralized data loading function
-    partitions = {}
+    import plotly.graph_objects as go
 
-    for year, df in dataframes.items():
-        G = generate_undirected_graph(df)
-        partitions[year] = detect_communities(G)
+    dataframes = read_matrix_article()  # Using the centralized data loading function
+    partitions = {year: yearly_partition(year) for year in dataframes}
 
     all_community_ids = set()
     for partition in partitions.values():
@@ -215,9 +230,9 @@ def create_parallel_bar_chart():
     for year, data in dataframes.items():
         partition = partitions[year]
 
-        for entity in data['Entity1'].unique():
-            total_cooccurrence = data[(data['Entity1'] == entity) | (data['Entity2'] == entity)]['CoOccurrence'].sum()
-            size = min(4 + total_cooccurrence * 0.4, 10)
+        codes = data['Entity1_code'].unique()
+        sizes = np.minimum(4 + yearly_entity_strength(year).reindex(codes).to_numpy() * 0.4, 10)
+        for entity, size in zip(corpus.decode(codes), sizes):
             community_color = partition.get(entity, -1)
             color = colors[community_color % 3]
 
@@ -261,45 +276,15 @@ def create_parallel_bar_chart():
 
 def create_line_chart():
     """Create line chart showing G60 word frequency changes"""
-    changjiang_delta_places = load_map_location()
-    file_paths = [
-        r"data\2122_t_f.csv",
-        r"data\2223_t_f.csv",
-        r"data\2324_t_f.csv",
-        r"data\2425_t_f.csv"
-    ]
-
-    dfs = []
-    for file_path in file_paths:
-        if os.path.exists(file_path):
-            df = pd.read_csv(file_path)
-            year = os.path.basename(file_path)[:4]
-            df['year'] = year
-            dfs.append(df)
-
-    combined_df = pd.concat(dfs, ignore_index=True)
-    place_freq = {}
-
-    for _, row in combined_df.iterrows():
-        word = row['word']
-        freq = row['frequency']
-        year = row['year']
-
-        for place_name, (variants, lon, lat) in changjiang_delta_places.items():
-            if word in variants:
-                if place_name not in place_freq:
-                    place_freq[place_name] = {}
-                if year not in place_freq[place_name]:
-                    place_freq[place_name][year] = 0
-                place_freq[place_name][year] += freq
-                break
-
-    result_df_list = []
-    for place_name, yearly_freq in place_freq.items():
-        for year, freq in yearly_freq.items():
-            result_df_list.append({'place': place_name, 'year': year, 'frequency': freq})
-
-    place_freq_df = pd.DataFrame(result_df_list).sort_values(by=['place', 'year'])
+    import plotly.express as px
+
+    places, years, counts = place_frequency_cube()
+    place_freq_df = pd.DataFrame({
+        'place': np.repeat(places['place'].to_numpy(), len(years)),
+        'year': np.tile(np.array(years, dtype=object), len(places)),
+        'frequency': counts.ravel()
+    })
+    place_freq_df = place_freq_df[place_freq_df['frequency'] > 0].sort_values(by=['place', 'year'])
     fig = px.line(place_freq_df, x='year', y='frequency', color='place',
                   title='G60 word frequncy change (2021-2025)',
                   labels={'year': '年份', 'frequency': '词频', 'place': '地名'},
@@ -315,6 +300,12 @@ def create_line_chart():
 
 def create_cooccurrence_network():
     """Create co-occurrence network visualization"""
+    import networkx as nx
+    import plotly.graph_objects as go
+    from matplotlib.colors import to_hex
+    from layout import cached_layout
+    import matplotlib.colors as mcolors
+
     df = read_entity_dict()
 
     category_colors = {
@@ -336,7 +327,7 @@ def create_cooccurrence_network():
         if df.iloc[i]['category'] == df.iloc[i + 1]['category']:
             G.add_edge(df.iloc[i]['entity'], df.iloc[i + 1]['entity'], weight=0.5)
 
-    pos = nx.spring_layout(G, k=0.5, iterations=100, seed=42)
+    pos = cached_layout(G, name='cooccurrence', k=0.5, iterations=100, seed=42)
 
     edge_x = []
     edge_y = []
@@ -421,13 +412,17 @@ def create_cooccurrence_network():
 
 def create_force_directed_network():
     """Create force-directed network visualization matching the matplotlib version"""
-    years = ['2122', '2223', '2324', '2425']
+    import networkx as nx
+    import plotly.graph_objects as go
+    from plotly.colors import qualitative
+
     sample_data = {
         '2122': [('发展', 8676), ('长三角', 7189), ('企业', 6240), ('产业', 5868), ('创新', 5494)],
         '2223': [('发展', 8000), ('长三角', 7000), ('科创', 6500), ('产业', 6000), ('G60', 5500)],
         '2324': [('科创', 7500), ('G60', 7000), ('发展', 6800), ('长三角', 6500), ('一体化', 6000)],
         '2425': [('一体化', 8000), ('科创', 7800), ('G60', 7500), ('数字经济', 7000), ('发展', 6800)]
     }
+    years = list(sample_data)
 
     # Create graph
     G = nx.DiGraph()
@@ -623,13 +618,19 @@ def create_force_directed_network():
 
 def create_heatmap():
     """Create co-occurrence heatmap visualization"""
-    dataframes = read_matrix_article()
-
-    merged_data = pd.concat([df.assign(year=year) for year, df in dataframes.items()], ignore_index=True)
-    pivot_table = merged_data.pivot_table(index='Entity1', columns='Entity2', values='CoOccurrence', aggfunc='sum',
-                                          fill_value=0)
-    pivot_table.sort_index(inplace=True)
-    pivot_table = pivot_table.reindex(sorted(pivot_table.columns), axis=1)
+    import plotly.express as px
+    import cooc
+
+    # 直接从稀疏共现存储取四年合计；只把共现总量最大的 HEATMAP_MAX_ENTITIES 个实体展开成方阵，
+    # 稠密部分的大小与实体总数无关
+    matrix = cooc.symmetric(cooc.all_years_matrix())
+    strength = np.asarray(matrix.sum(axis=1)).ravel()
+    codes = np.flatnonzero(strength)
+    codes = codes[np.lexsort((codes, -strength[codes]))][:HEATMAP_MAX_ENTITIES]
+    labels = corpus.decode(codes)
+    order = np.argsort(labels)
+    codes, labels = codes[order], labels[order]
+    pivot_table = pd.DataFrame(matrix[codes][:, codes].toarray(), index=labels, columns=labels)
 
     fig = px.imshow(pivot_table,
                     labels=dict(x="Entity2", y="Entity1", color="Co-occurrence"),
@@ -652,29 +653,10 @@ def create_heatmap():
 
 def create_changjiang_map():
     """Create Changjiang Delta map visualization"""
-    changjiang_delta_places = load_map_location()
-
-    file_paths = [
-        r"data\2122_t_f.csv",
-        r"data\2223_t_f.csv",
-        r"data\2324_t_f.csv",
-        r"data\2425_t_f.csv"
-    ]
-
-    combined_df = pd.concat([pd.read_csv(fp) for fp in file_paths], ignore_index=True)
+    import plotly.express as px
+    from gazetteer import within_bbox
 
-    place_freq = {}
-    for place_name, (variants, lon, lat) in changjiang_delta_places.items():
-        place_freq[place_name] = {
-            'frequency': combined_df[combined_df['word'].isin(variants)]['frequency'].sum(),
-            'longitude': lon,
-            'latitude': lat
-        }
-
-    place_freq_df = pd.DataFrame.from_dict(place_freq, orient='index')
-    place_freq_df = place_freq_df[place_freq_df['frequency'] > 0]
-    place_freq_df.reset_index(inplace=True)
-    place_freq_df.rename(columns={'index': 'place'}, inplace=True)
+    place_freq_df = place_totals(within_bbox(*CHANGJIANG_BBOX))
 
     fig = px.scatter_geo(place_freq_df,
                          lat='latitude',
@@ -707,35 +689,18 @@ def create_changjiang_map():
 
 def create_shanghai_map():
     """Create Shanghai map visualization"""
-    shanghai_places = {
-        '上海': [['上海', '上海市'], 121.47, 31.23],
-        '松江': [['松江', '松江区'], 121.23, 31.03],
-        '虹桥': [['虹桥'], 121.38, 31.20],
-        '张江': [['张江'], 121.58, 31.20],
-        '临港': [['临港'], 121.88, 30.90]
-    }
-
-    file_paths = [
-        r"data\2122_t_f.csv",
-        r"data\2223_t_f.csv",
-        r"data\2324_t_f.csv",
-        r"data\2425_t_f.csv"
-    ]
+    from gazetteer import within_radius
+    return create_region_map(within_radius('上海', SHANGHAI_RADIUS_KM, province='上海'), '上海',
+                             'Shanghai Word Frequency Map (2021-2025)')
 
-    combined_df = pd.concat([pd.read_csv(fp) for fp in file_paths], ignore_index=True)
 
-    place_freq = {}
-    for place_name, (variants, lon, lat) in shanghai_places.items():
-        place_freq[place_name] = {
-            'frequency': combined_df[combined_df['word'].isin(variants)]['frequency'].sum(),
-            'longitude': lon,
-            'latitude': lat
-        }
+def create_region_map(names, center, title, projection_scale=20):
+    """Word frequency map of the given gazetteer places, centred on center (a place name or (lon, lat))"""
+    import plotly.express as px
+    from gazetteer import locate
 
-    place_freq_df = pd.DataFrame.from_dict(place_freq, orient='index')
-    place_freq_df = place_freq_df[place_freq_df['frequency'] > 0]
-    place_freq_df.reset_index(inplace=True)
-    place_freq_df.rename(columns={'index': 'place'}, inplace=True)
+    place_freq_df = place_totals(names)
+    center_lon, center_lat = locate(center)
 
     fig = px.scatter_geo(place_freq_df,
                          lat='latitude',
@@ -744,12 +709,12 @@ def create_shanghai_map():
                          hover_name='place',
                          hover_data={'frequency': True, 'latitude': False, 'longitude': False},
                          scope='asia',
-                         title='Shanghai Word Frequency Map (2021-2025)')
+                         title=title)
 
     fig.update_geos(
         resolution=50,
-        center=dict(lat=31.23, lon=121.47),
-        projection_scale=20,
+        center=dict(lat=center_lat, lon=center_lon),
+        projection_scale=projection_scale,
         showcountries=True,
         showsubunits=True,
         landcolor='lightgray',
@@ -766,20 +731,12 @@ def create_shanghai_map():
 
 def create_parallel_categories():
     """Create parallel categories visualization of community evolution"""
-    years = ['2122', '2223', '2324', '2425']
-    dataframes = {}
-    partitions = {}
+    import plotly.graph_objects as go
 
-    for year in years:
-        file_path = f"data/{year}_matrix_article.csv"
-        dataframes[year] = pd.read_csv(file_path)
-        G = generate_undirected_graph(dataframes[year])
-        partitions[year] = detect_communities(G)
-
-        # Standardize community IDs
-        unique_ids = sorted(set(partitions[year].values()))
-        id_mapping = {old: new for new, old in enumerate(unique_ids)}
-        partitions[year] = {k: id_mapping[v] for k, v in partitions[year].items()}
+    years = corpus.periods()
+    dataframes = read_matrix_article()
+    # 社区ID在各时期间延续（同一ID = 同一社区），流向才有意义
+    partitions = {year: yearly_temporal_partition(year)[0] for year in years}
 
     # Create node data
     entity_data = {}
@@ -787,9 +744,9 @@ def create_parallel_categories():
         data = dataframes[year]
         partition = partitions[year]
 
-        for entity in data['Entity1'].unique():
-            total_cooccurrence = data[(data['Entity1'] == entity) | (data['Entity2'] == entity)]['CoOccurrence'].sum()
-            size = min(4 + total_cooccurrence * 0.4, 10)
+        codes = data['Entity1_code'].unique()
+        sizes = np.minimum(4 + yearly_entity_strength(year).reindex(codes).to_numpy() * 0.4, 10)
+        for entity, size in zip(corpus.decode(codes), sizes):
             community_id = partition.get(entity, -1)
 
             if entity not in entity_data:
@@ -808,19 +765,22 @@ def create_parallel_categories():
     ])
 
     # Create figure
-    community_colors = ["#1f77b4", "#ff7f0e", "#2ca02c"]
+    # 社区ID跨时期延续，可能多于3个：类别和颜色都按实际出现的ID生成（-1 表示该时期没有出现）
+    palette = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+               "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf"]
+    community_ids = sorted(set(df[[f'community_{year}' for year in years]].to_numpy().ravel().tolist()) - {-1})
+    community_colors = {cid: palette[i % len(palette)] for i, cid in enumerate(community_ids)}
     community_names = {0: "技术", 1: "资本", 2: "产业"}
 
     fig = go.Figure(go.Parcats(
         dimensions=[
-            {'label': f'20{year[:2]}-20{year[2:]}',
+            {'label': corpus.period_label(year),
              'values': df[f'community_{year}'],
-             'categoryarray': [0, 1, 2]
+             'categoryarray': community_ids
              } for year in years
         ],
         line={
-            'color': [community_colors[cid] if cid in [0, 1, 2] else '#CCCCCC'
-                      for cid in df[f'community_{years[0]}']],
+            'color': [community_colors.get(cid, '#CCCCCC') for cid in df[f'community_{years[0]}']],
             'shape': 'hspline'
         },
         labelfont={'size': 14, 'family': 'SimHei'},
@@ -828,12 +788,12 @@ def create_parallel_categories():
     ))
 
     # Add legend
-    for i, color in enumerate(community_colors):
+    for cid, color in community_colors.items():
         fig.add_trace(go.Scatter(
             x=[None], y=[None],
             mode='markers',
             marker=dict(size=10, color=color),
-            name=community_names[i],
+            name=community_names.get(cid, f'社区 {cid + 1}'),
             showlegend=True
         ))
 
@@ -850,47 +810,40 @@ def create_parallel_categories():
 
 def create_rd_trend_plot():
     """创建与研发共现实体的趋势图，匹配原matplotlib版本的样式"""
-    file_paths = {
-        "2122": r"data\2122_matrix_article.csv",
-        "2223": r"data\2223_matrix_article.csv",
-        "2324": r"data\2324_matrix_article.csv",
-        "2425": r"data\2425_matrix_article.csv"
-    }
+    return create_partner_trend_plot('研发')
 
-    # 加载所有年份数据
-    all_data = pd.concat([pd.read_csv(path).assign(Year=year) for year, path in file_paths.items()])
 
-    # 2. 处理与"研发"共现的数据
-    # 确保"研发"始终在Entity1列
-    investment_data = all_data[(all_data['Entity1'] == '研发') | (all_data['Entity2'] == '研发')].copy()
-    mask = investment_data['Entity2'] == '研发'
-    investment_data.loc[mask, ['Entity1', 'Entity2']] = investment_data.loc[mask, ['Entity2', 'Entity1']].values
+def create_partner_trend_plot(entity, top_n=10):
+    """与任一实体共现最多的 top_n 个实体的逐年共现趋势（查询共现存储的伙伴索引，不扫描全表）"""
+    import plotly.graph_objects as go
+    import cooc
+    from gen_net import detect_communities, CONSENSUS_RUNS
 
-    # 3. 获取与"研发"共现最多的10个实体
-    top_entities = investment_data.groupby('Entity2')['CoOccurrence'].sum().nlargest(10).index.tolist()
+    # 3. 获取与该实体共现最多的 top_n 个实体（全部年份合计）
+    top_entities = cooc.neighbors(entity, k=top_n)['Entity'].tolist()
 
-    # 4. 构建共现网络并检测社区
-    filtered_data = all_data[
-        (all_data['Entity1'].isin(top_entities + ['研发'])) &
-        (all_data['Entity2'].isin(top_entities + ['研发']))
-        ]
-    G = generate_undirected_graph(filtered_data)
-    partition = detect_communities(G)
+    # 4. 中心实体与这些伙伴构成的共现网络，检测社区
+    G = cooc.ego_graph(entity, depth=1, k=top_n)
+    # 未知实体（空图）或没有伙伴时没有社区可分，画空图；图表在流水线的工作进程里构建，共识运行保持串行
+    partition = detect_communities(G, runs=CONSENSUS_RUNS, max_workers=1) if G.number_of_edges() else {}
 
-    # 5. 准备绘图数据
+    # 5. 准备绘图数据（只包含该实体有共现的年份）
+    series = {partner: cooc.pair_series(entity, partner) for partner in top_entities}
     plot_data = []
-    for year, year_data in investment_data.groupby('Year'):
-        for entity in top_entities:
-            co_occurrence = year_data[year_data['Entity2'] == entity]['CoOccurrence'].sum()
-            community_id = partition.get(entity, -1)
+    for year in corpus.periods():
+        if cooc.neighbors(entity, year, k=1).empty:
+            continue
+        for partner in top_entities:
+            co_occurrence = series[partner][year]
+            community_id = partition.get(partner, -1)
             plot_data.append({
                 'Year': year,
-                'Entity': entity,
+                'Entity': partner,
                 'CoOccurrence': co_occurrence,
                 'Community': f'社区 {community_id + 1}'  # 使用中文
             })
 
-    plot_df = pd.DataFrame(plot_data)
+    plot_df = pd.DataFrame(plot_data, columns=['Year', 'Entity', 'CoOccurrence', 'Community'])
 
     # 6. 创建可视化图表
     fig = go.Figure()
@@ -900,8 +853,8 @@ def create_rd_trend_plot():
               '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
 
     # 为每个实体添加折线
-    for i, entity in enumerate(plot_df['Entity'].unique()):
-        entity_data = plot_df[plot_df['Entity'] == entity]
+    for i, partner in enumerate(plot_df['Entity'].unique()):
+        entity_data = plot_df[plot_df['Entity'] == partner]
         community = entity_data['Community'].iloc[0]
         color_idx = int(community.split()[-1]) - 1  # 获取社区索引用于配色
 
@@ -909,17 +862,17 @@ def create_rd_trend_plot():
             x=entity_data['Year'],
             y=entity_data['CoOccurrence'],
             mode='lines+markers',
-            name=entity,
+            name=partner,
             line=dict(color=colors[color_idx % len(colors)], width=2),
             marker=dict(symbol='circle', size=8),
             legendgroup=community,
-            hovertemplate=f"<b>{entity}</b><br>年份: %{{x}}<br>共现次数: %{{y}}<extra></extra>"
+            hovertemplate=f"<b>{partner}</b><br>年份: %{{x}}<br>共现次数: %{{y}}<extra></extra>"
         ))
 
     # 7. 设置图表布局
     fig.update_layout(
         title=dict(
-            text='Top Entities Co-occurring with "研发" (2021-2025)',
+            text=f'Top Entities Co-occurring with "{entity}" (2021-2025)',
             font=dict(size=18, family='SimHei'),
             x=0.5,
             xanchor='center'
@@ -927,8 +880,8 @@ def create_rd_trend_plot():
         xaxis=dict(
             title='年份',
             tickmode='array',
-            tickvals=['2122', '2223', '2324', '2425'],
-            ticktext=['2021-2022', '2022-2023', '2023-2024', '2024-2025'],
+            tickvals=corpus.periods(),
+            ticktext=[corpus.period_label(year) for year in corpus.periods()],
             title_font=dict(family='SimHei')
         ),
         yaxis=dict(
@@ -968,6 +921,8 @@ def create_rd_trend_plot():
 
 def create_radar_chart():
     """Create radar chart matching the matplotlib version"""
+    import plotly.graph_objects as go
+
     # Read data
     df = read_entity_dict()
 
@@ -1087,6 +1042,9 @@ def create_radar_chart():
 
 def create_stacked_bar():
     """创建按类别分组的实体频率堆叠柱状图，匹配原Python文件中的样式"""
+    import plotly.express as px
+    from plotly.colors import hex_to_rgb
+
 
     # 1. 数据准备
     df = read_entity_dict()
@@ -1180,69 +1138,160 @@ def create_stacked_bar():
     )
 
     return fig
-def create_combined_html():
-    """Combine all visualizations into a single HTML file"""
-    # Previous visualizations
-    sankey_fig = create_sankey_diagram()
-    bar_fig = create_parallel_bar_chart()
-    line_fig = create_line_chart()
-    cooccurrence_fig = create_cooccurrence_network()
-    force_directed_fig = create_force_directed_network()
-    heatmap_fig = create_heatmap()
-    changjiang_map_fig = create_changjiang_map()
-    shanghai_map_fig = create_shanghai_map()
-    parallel_cat_fig = create_parallel_categories()
-    rd_trend_fig = create_rd_trend_plot()
-    stacked_bar_fig = create_stacked_bar()
-    radar_fig = create_radar_chart()
-
-    # Create a combined HTML with all figures
-    with open('combined_visualizations.html', 'w') as f:
-        f.write('<html><head><title>Combined Visualizations</title></head><body>')
+# (名称, 小节标题, 构建函数, 读取的数据)，顺序即合并页面中的顺序
+FIGURES = [
+    ('sankey', 'Co-occurrence of Entities Over Four Years (Sankey Diagram)', create_sankey_diagram, ('matrix',)),
+    ('bar', 'Community Detection in Relationship Networks (Parallel Bar Chart)', create_parallel_bar_chart, ('matrix',)),
+    ('line', 'G60 Word Frequency Changes (Line Chart)', create_line_chart, ('word_freq',)),
+    ('cooccurrence', 'Co-occurrence Network Analysis', create_cooccurrence_network, ('entity_dict',)),
+    ('force_directed', 'Force-Directed Network of Word Evolution', create_force_directed_network, ()),
+    ('heatmap', 'Four-Year Co-occurrence Matrix Heatmap', create_heatmap, ('matrix',)),
+    ('changjiang_map', 'Changjiang Delta Word Frequency Map', create_changjiang_map, ('word_freq',)),
+    ('shanghai_map', 'Shanghai Word Frequency Map', create_shanghai_map, ('word_freq',)),
+    ('parallel_categories', 'Community Evolution Parallel Categories', create_parallel_categories, ('matrix',)),
+    ('rd_trend', 'R&D Co-occurrence Trend', create_rd_trend_plot, ('matrix',)),
+    ('stacked_bar', 'Entity Frequency by Category (Stacked Bar)', create_stacked_bar, ('entity_dict',)),
+    ('radar', 'Word Frequency Radar Chart', create_radar_chart, ('entity_dict',)),
+]
+
+# 图表依赖的按年份派生结果（在流水线中作为共享阶段只计算一次）
+# CHAINED_STAGES 中的结果依赖上一时期的同类结果，按时期顺序串行
+FIGURE_STAGES = {
+    'bar': ['partition', 'strength'],
+    'parallel_categories': ['temporal_partition', 'strength'],
+    'line': ['place_freq'],
+    'changjiang_map': ['place_freq'],
+    'shanghai_map': ['place_freq'],
+}
+CHAINED_STAGES = {'temporal_partition'}
+
+
+def build_figure_html(builder, inputs, use_cache=True):
+    """Return the HTML fragment of one figure, reusing the cached build when inputs and code are unchanged"""
+    import figure_cache
+
+    key = figure_cache.fingerprint(builder, inputs) if use_cache else None
+    if key is not None:
+        html = figure_cache.get_html(key)
+        if html is not None:
+            return html
+
+    fig = builder()
+    html = fig.to_html(full_html=False, include_plotlyjs='cdn')
+    if key is not None:
+        figure_cache.put(key, fig, html)
+    return html
+
+
+def warm_corpus():
+    """Compile the sparse store and parse the source files once, before the parallel stages start
+
+    Periods the store compiles in streaming mode are not loaded whole here, so a large export
+    never has to fit in memory at once.
+    """
+    import cooc
+
+    cooc.compile_store()
+    years = [year for year in corpus.periods() if not cooc.uses_streaming(year)]
+    if years:
+        corpus.load_matrices(years)
+        corpus.load_word_freqs(years)
+    corpus.load_entity_dict()
+
+
+def timed_figure_html(builder, inputs, use_cache=True):
+    start = time.perf_counter()
+    html = build_figure_html(builder, inputs, use_cache)
+    return html, time.perf_counter() - start
+
+
+def dashboard_stages(names=None, use_cache=True):
+    """Stages for the selected figures: load -> per-year partition / place frequencies -> figures"""
+    import pipeline
+
+    derived = {'partition': yearly_partition, 'temporal_partition': yearly_temporal_partition,
+               'strength': yearly_entity_strength, 'place_freq': yearly_place_frequencies}
+    selected = [figure for figure in FIGURES if names is None or figure[0] in names]
+
+    stages = [pipeline.Stage('load', warm_corpus)]
+    needed = {kind for name, _, _, _ in selected for kind in FIGURE_STAGES.get(name, [])}
+    for kind in sorted(needed):
+        previous = None
+        for year in corpus.periods():
+            deps = ['load'] + ([f'{kind}:{previous}'] if kind in CHAINED_STAGES and previous else [])
+            stages.append(pipeline.Stage(f'{kind}:{year}', derived[kind], (year,), deps))
+            previous = year
+
+    for name, _, builder, inputs in selected:
+        deps = ['load'] + [f'{kind}:{year}' for kind in FIGURE_STAGES.get(name, []) for year in corpus.periods()]
+        stages.append(pipeline.Stage(f'figure:{name}', timed_figure_html, (builder, inputs, use_cache), deps))
+    return stages
+
+
+def create_combined_html(names=None, output='combined_visualizations.html', timings=None, use_cache=True,
+                         jobs=1):
+    """Combine the selected visualizations (all by default) into a single HTML file
+
+    Figures are built by a dependency-aware pipeline; jobs > 1 runs independent stages in a
+    process pool. If a dict is passed as timings, the build time of each figure is recorded in it.
+    """
+    import pipeline
+
+    results = pipeline.run(dashboard_stages(names, use_cache), max_workers=jobs)
+
+    sections = []
+    for name, title, _, _ in FIGURES:
+        if f'figure:{name}' not in results:
+            continue
+        html, seconds = results[f'figure:{name}']
+        sections.append((title, html))
+        if timings is not None:
+            timings[name] = seconds
+
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write('<html><head><meta charset="utf-8"><title>Combined Visualizations</title></head><body>')
         f.write('<h1 style="text-align:center">Combined Visualizations</h1>')
+        for title, html in sections:
+            f.write(f'<h2 style="text-align:center">{title}</h2>')
+            f.write(html)
+        f.write('</body></html>')
 
-        f.write('<h2 style="text-align:center">Co-occurrence of Entities Over Four Years (Sankey Diagram)</h2>')
-        f.write(sankey_fig.to_html(full_html=False, include_plotlyjs='cdn'))
-
-        f.write('<h2 style="text-align:center">Community Detection in Relationship Networks (Parallel Bar Chart)</h2>')
-        f.write(bar_fig.to_html(full_html=False, include_plotlyjs='cdn'))
-
-        f.write('<h2 style="text-align:center">G60 Word Frequency Changes (Line Chart)</h2>')
-        f.write(line_fig.to_html(full_html=False, include_plotlyjs='cdn'))
-
-        f.write('<h2 style="text-align:center">Co-occurrence Network Analysis</h2>')
-        f.write(cooccurrence_fig.to_html(full_html=False, include_plotlyjs='cdn'))
-
-        f.write('<h2 style="text-align:center">Force-Directed Network of Word Evolution</h2>')
-        f.write(force_directed_fig.to_html(full_html=False, include_plotlyjs='cdn'))
-
-        f.write('<h2 style="text-align:center">Four-Year Co-occurrence Matrix Heatmap</h2>')
-        f.write(heatmap_fig.to_html(full_html=False, include_plotlyjs='cdn'))
-
-        # New visualizations
-        f.write('<h2 style="text-align:center">Changjiang Delta Word Frequency Map</h2>')
-        f.write(changjiang_map_fig.to_html(full_html=False, include_plotlyjs='cdn'))
+    print(f"Combined HTML file created: {output}")
 
-        f.write('<h2 style="text-align:center">Shanghai Word Frequency Map</h2>')
-        f.write(shanghai_map_fig.to_html(full_html=False, include_plotlyjs='cdn'))
 
-        f.write('<h2 style="text-align:center">Community Evolution Parallel Categories</h2>')
-        f.write(parallel_cat_fig.to_html(full_html=False, include_plotlyjs='cdn'))
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the G60 visualization dashboard')
+    parser.add_argument('figures', nargs='*', metavar='FIGURE',
+                        help='figures to build (default: all), see --list')
+    parser.add_argument('--list', action='store_true', help='list the available figures and exit')
+    parser.add_argument('-o', '--output', default='combined_visualizations.html', help='output HTML file')
+    parser.add_argument('--timings', action='store_true', help='report startup and per-figure build times')
+    parser.add_argument('--no-cache', action='store_true', help='rebuild every figure instead of reusing cached ones')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(),
+                        help='worker processes for independent stages (default: all cores, 1 = serial)')
+    args = parser.parse_args(argv)
 
-        # New visualizations sections
-        f.write('<h2 style="text-align:center">R&D Co-occurrence Trend</h2>')
-        f.write(rd_trend_fig.to_html(full_html=False, include_plotlyjs='cdn'))
+    startup = time.perf_counter() - _IMPORT_START
 
-        f.write('<h2 style="text-align:center">Entity Frequency by Category (Stacked Bar)</h2>')
-        f.write(stacked_bar_fig.to_html(full_html=False, include_plotlyjs='cdn'))
+    if args.list:
+        for name, title, _, _ in FIGURES:
+            print(f'{name:<20} {title}')
+        return
 
-        f.write('<h2 style="text-align:center">Word Frequency Radar Chart</h2>')
-        f.write(radar_fig.to_html(full_html=False, include_plotlyjs='cdn'))
+    known = [name for name, _, _, _ in FIGURES]
+    unknown = [name for name in args.figures if name not in known]
+    if unknown:
+        parser.error(f"unknown figure(s): {', '.join(unknown)} (choose from {', '.join(known)})")
 
-        f.write('</body></html>')
+    timings = {}
+    create_combined_html(args.figures or None, args.output, timings, use_cache=not args.no_cache, jobs=args.jobs)
 
-    print("Combined HTML file created: combined_visualizations.html")
+    if args.timings:
+        print(f"{'startup':<20} {startup:8.3f} s")
+        for name, seconds in timings.items():
+            print(f'{name:<20} {seconds:8.3f} s')
+        print(f"{'total':<20} {time.perf_counter() - _IMPORT_START:8.3f} s")
 
 
 if __name__ == "__main__":
-     create_combined_html()
+    main()
@@ -0,0 +1,158 @@
+import os
+import sys
+import ast
+import hashlib
+import inspect
+import corpus
+
+# 已构建图表的内容寻址缓存: 键 = 输入数据切片的哈希 + 构建函数（及其依赖）源码的哈希
+FIGURE_CACHE_DIR = os.path.join(corpus.CACHE_DIR, 'figures')
+MAX_CACHE_BYTES = 256 << 20
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _input_paths(inputs):
+    paths = []
+    for kind in inputs:
+        if kind == 'matrix':
+            paths += [path for year in corpus.periods() for path in corpus.matrix_shards(year)]
+        elif kind == 'word_freq':
+            paths += [path for year in corpus.periods() for path in corpus.word_freq_shards(year)]
+        elif kind == 'entity_dict':
+            paths.append(os.path.join(corpus.DATA_DIR, 'entity_dict.csv'))
+        else:
+            raise ValueError(f"unknown input kind: {kind}")
+    return paths
+
+
+def _imported_modules(source):
+    """Top-level names of the modules a source file imports (anywhere in the file, including inside functions)"""
+    names = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            names.add(node.module.split('.')[0])
+    return names
+
+
+def _code_sources(func):
+    """Source of func plus every module-level helper, constant and local module it (transitively) refers to
+
+    A local module contributes its whole file and, recursively, every local module that file imports.
+    A module-level constant contributes its repr, so retuning e.g. HEATMAP_MAX_ENTITIES invalidates the figure.
+    """
+    module = sys.modules[func.__module__]
+    seen = set()
+    modules = set()
+    sources = [inspect.getsource(func)]
+
+    def visit_module(name):
+        module_file = os.path.join(REPO_DIR, f'{name}.py')
+        if name in modules or name == module.__name__ or not os.path.exists(module_file):
+            return
+        modules.add(name)
+        with open(module_file, encoding='utf-8') as f:
+            source = f.read()
+        sources.append(source)
+        for imported in sorted(_imported_modules(source)):
+            visit_module(imported)
+
+    def visit(code):
+        for name in code.co_names:
+            if name in seen:
+                continue
+            seen.add(name)
+            obj = getattr(module, name, None)
+            if inspect.isfunction(obj) and obj.__module__ == module.__name__:
+                sources.append(inspect.getsource(obj))
+                visit(obj.__code__)
+            elif name in vars(module) and not name.startswith('__') and not callable(obj) and not inspect.ismodule(obj):
+                sources.append(f'{name} = {obj!r}')
+            else:
+                visit_module(name)
+        for const in code.co_consts:
+            if inspect.iscode(const):
+                visit(const)
+
+    visit(func.__code__)
+    return sources
+
+
+def fingerprint(builder, inputs):
+    """Cache key of a builder: hash of the data files it reads and of its code"""
+    h = hashlib.sha1()
+    for source in _code_sources(builder):
+        h.update(source.encode('utf-8'))
+    for path in _input_paths(inputs):
+        h.update(os.path.basename(path).encode('utf-8'))
+        h.update(corpus.file_digest(path).encode('ascii'))
+    return f'{builder.__name__}-{h.hexdigest()}'
+
+
+def _entry_paths(key):
+    return os.path.join(FIGURE_CACHE_DIR, f'{key}.json'), os.path.join(FIGURE_CACHE_DIR, f'{key}.html')
+
+
+def get_html(key):
+    """Return the cached HTML fragment for key, or None"""
+    json_path, html_path = _entry_paths(key)
+    if not (os.path.exists(json_path) and os.path.exists(html_path)):
+        return None
+    # 更新时间戳，淘汰时按最近使用排序
+    os.utime(json_path)
+    os.utime(html_path)
+    with open(html_path, encoding='utf-8') as f:
+        return f.read()
+
+
+def get_figure(key):
+    """Return the cached plotly figure for key, or None"""
+    import plotly.io as pio
+
+    json_path, _ = _entry_paths(key)
+    if not os.path.exists(json_path):
+        return None
+    with open(json_path, encoding='utf-8') as f:
+        return pio.from_json(f.read())
+
+
+def put(key, fig, html):
+    json_path, html_path = _entry_paths(key)
+    os.makedirs(FIGURE_CACHE_DIR, exist_ok=True)
+    for path, content in ((json_path, fig.to_json()), (html_path, html)):
+        tmp_path = path + f'.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    evict()
+
+
+def evict(max_bytes=MAX_CACHE_BYTES):
+    """Delete least recently used entries until the cache is under max_bytes"""
+    if not os.path.isdir(FIGURE_CACHE_DIR):
+        return
+    entries = {}
+    for name in os.listdir(FIGURE_CACHE_DIR):
+        key, ext = os.path.splitext(name)
+        if ext not in ('.json', '.html'):
+            continue
+        try:
+            stat = os.stat(os.path.join(FIGURE_CACHE_DIR, name))
+        except FileNotFoundError:
+            continue
+        size, mtime = entries.get(key, (0, 0))
+        entries[key] = (size + stat.st_size, max(mtime, stat.st_mtime))
+
+    total = sum(size for size, _ in entries.values())
+    for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+        if total <= max_bytes:
+            break
+        for path in _entry_paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # 另一个进程已经淘汰了这个条目
+                pass
+        total -= size
@@ -0,0 +1,275 @@
+import functools
+import re
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# 长三角地名表: 地名 -> [[变体, ...], 经度, 纬度]
+# 全项目共用这一份；扩充地名只需在这里添加条目
+PLACES = {
+    '上海': [['上海', '上海市'], 121.47, 31.23],
+    '江苏': [['江苏', '江苏省'], 118.78, 32.07],
+    '浙江': [['浙江', '浙江省'], 120.15, 30.28],
+    '安徽': [['安徽', '安徽省'], 117.28, 31.86],
+    '南京': [['南京', '南京市'], 118.78, 32.07],
+    '苏州': [['苏州', '苏州市'], 120.62, 31.32],
+    '杭州': [['杭州', '杭州市'], 120.15, 30.28],
+    '合肥': [['合肥', '合肥市'], 117.28, 31.86],
+    '宁波': [['宁波', '宁波市'], 121.55, 29.88],
+    '无锡': [['无锡', '无锡市'], 120.30, 31.57],
+    '常州': [['常州', '常州市'], 119.95, 31.78],
+    '南通': [['南通', '南通市'], 120.86, 32.01],
+    '扬州': [['扬州', '扬州市'], 119.42, 32.39],
+    '镇江': [['镇江', '镇江市'], 119.45, 32.20],
+    '泰州': [['泰州', '泰州市'], 119.90, 32.49],
+    '盐城': [['盐城', '盐城市'], 120.15, 33.35],
+    '淮安': [['淮安', '淮安市'], 119.02, 33.62],
+    '宿迁': [['宿迁', '宿迁市'], 118.28, 33.96],
+    '徐州': [['徐州', '徐州市'], 117.18, 34.26],
+    '连云港': [['连云港', '连云港市'], 119.16, 34.59],
+    '温州': [['温州', '温州市'], 120.70, 28.00],
+    '绍兴': [['绍兴', '绍兴市'], 120.58, 30.01],
+    '湖州': [['湖州', '湖州市'], 120.09, 30.89],
+    '嘉兴': [['嘉兴', '嘉兴市'], 120.76, 30.77],
+    '金华': [['金华', '金华市'], 119.65, 29.08],
+    '衢州': [['衢州', '衢州市'], 118.87, 28.94],
+    '台州': [['台州', '台州市'], 121.42, 28.66],
+    '丽水': [['丽水', '丽水市'], 119.92, 28.45],
+    '舟山': [['舟山', '舟山市'], 122.20, 30.00],
+    '芜湖': [['芜湖', '芜湖市'], 118.38, 31.33],
+    '马鞍山': [['马鞍山', '马鞍山市'], 118.51, 31.70],
+    '铜陵': [['铜陵', '铜陵市'], 117.82, 30.94],
+    '安庆': [['安庆', '安庆市'], 117.07, 30.52],
+    '滁州': [['滁州', '滁州市'], 118.32, 32.30],
+    '池州': [['池州', '池州市'], 117.49, 30.67],
+    '宣城': [['宣城', '宣城市'], 118.76, 30.95],
+    '松江': [['松江', '松江区'], 121.23, 31.03],
+    '虹桥': [['虹桥'], 121.38, 31.20],
+    '张江': [['张江'], 121.58, 31.20],
+    '临港': [['临港'], 121.88, 30.90],
+    '昆山': [['昆山', '昆山市'], 120.95, 31.39],
+    '嘉善': [['嘉善', '嘉善县'], 120.92, 30.84],
+    '嘉兴港区': [['嘉兴港区'], 121.10, 30.60],
+    '杭州湾': [['杭州湾'], 121.15, 30.30],
+    '金华经开区': [['金华经开区'], 119.65, 29.08],
+    '合肥高新区': [['合肥高新区'], 117.20, 31.80],
+    '苏州工业园': [['苏州工业园', '苏州工业园区'], 120.70, 31.32]
+}
+
+# 地名所属的省级行政区；每个地名恰好属于一个省/直辖市。空间查询可以按省过滤（上海周边55公里内还有江苏的昆山）
+PROVINCES = {
+    '上海': ['上海', '松江', '虹桥', '张江', '临港'],
+    '江苏': ['江苏', '南京', '苏州', '无锡', '常州', '南通', '扬州', '镇江', '泰州', '盐城', '淮安', '宿迁',
+           '徐州', '连云港', '昆山', '苏州工业园'],
+    '浙江': ['浙江', '杭州', '宁波', '温州', '绍兴', '湖州', '嘉兴', '金华', '衢州', '台州', '丽水', '舟山',
+           '嘉善', '嘉兴港区', '杭州湾', '金华经开区'],
+    '安徽': ['安徽', '合肥', '芜湖', '马鞍山', '铜陵', '安庆', '滁州', '池州', '宣城', '合肥高新区']
+}
+
+EARTH_RADIUS_KM = 6371.0
+
+# 地名后紧跟这些字时是路名、河名等（'南京路'、'南京东路'、'苏州河'），不算提到该地
+NON_PLACE_SUFFIX = re.compile(r'[东西南北中]?(?:路|大道|大街|街|巷|弄|河|浜)')
+
+
+def variant_lookup(places=None):
+    """
+    把地名表编译成 变体 -> 地名 的字典
+    参数:
+        places: {地名: [[变体, ...], 经度, 纬度]}，默认 PLACES
+    返回:
+        dict: 变体 -> 地名；一个变体属于多个地名时取最先出现的地名（与逐行扫描的匹配顺序一致）
+    """
+    lookup = {}
+    for place_name, (variants, lon, lat) in (PLACES if places is None else places).items():
+        for variant in variants:
+            lookup.setdefault(variant, place_name)
+    return lookup
+
+
+def build_automaton(places=None):
+    """
+    由所有地名变体构建 Aho-Corasick 自动机
+    返回:
+        (goto, fail, output, link): 状态转移字典、失败指针、状态对应的 (变体长度, 地名)、
+        以及沿失败指针最近的有输出的状态（0 表示没有）
+    """
+    goto, fail, output = [{}], [0], [None]
+    for variant, place_name in variant_lookup(places).items():
+        state = 0
+        for ch in variant:
+            if ch not in goto[state]:
+                goto[state][ch] = len(goto)
+                goto.append({})
+                fail.append(0)
+                output.append(None)
+            state = goto[state][ch]
+        output[state] = (len(variant), place_name)
+
+    link = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for ch, child in goto[state].items():
+            f = fail[state]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[child] = goto[f].get(ch, 0)
+            link[child] = fail[child] if output[fail[child]] else link[fail[child]]
+            queue.append(child)
+    return goto, fail, output, link
+
+
+def find_mentions(text, automaton):
+    """
+    文本中提到的地名，从左到右、同一起点取最长的变体，匹配之间不重叠
+    例如 '苏州工业园区管委会' -> ['苏州工业园']，'上海松江' -> ['上海', '松江']
+    后面紧跟 NON_PLACE_SUFFIX 的匹配是路名、河名，不计入：'南京路'、'苏州河' -> []
+    时间与文本长度（加上匹配数）成正比，与地名表大小无关
+    """
+    goto, fail, output, link = automaton
+    longest = [None] * len(text)
+    state = 0
+    for end, ch in enumerate(text, 1):
+        while state and ch not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(ch, 0)
+        match = state if output[state] else link[state]
+        while match:
+            length, place_name = output[match]
+            start = end - length
+            if longest[start] is None or longest[start][0] < length:
+                longest[start] = (length, place_name)
+            match = link[match]
+
+    mentions = []
+    covered = 0
+    for start, best in enumerate(longest):
+        if best is not None and start >= covered:
+            covered = start + best[0]
+            if not NON_PLACE_SUFFIX.match(text, covered):
+                mentions.append(best[1])
+    return mentions
+
+
+def word_mentions(words, automaton):
+    """每个不同的词中提到的地名，DataFrame: word, place（一次提及一行）"""
+    rows = [(word, place_name)
+            for word in pd.unique(words) if isinstance(word, str)
+            for place_name in find_mentions(word, automaton)]
+    return pd.DataFrame(rows, columns=['word', 'place'])
+
+
+def text_frequencies(texts, places=None):
+    """原始文本（可迭代的字符串）中各地名被提及的次数，Series: 地名 -> 次数"""
+    automaton = build_automaton(places)
+    counts = {}
+    for text in texts:
+        for place_name in find_mentions(text, automaton):
+            counts[place_name] = counts.get(place_name, 0) + 1
+    return pd.Series(counts, dtype='int64')
+
+
+def place_frequencies(df, places=None, by=None, exact=False):
+    """
+    词频表中各地名的词频，再按地名（及 by 列）分组求和
+    默认用自动机匹配复合词（'上海松江' 同时计入上海和松江），'南京路'、'苏州河' 这类路名河名不计入（见 find_mentions）；
+    exact=True 时只认与变体完全相同的词
+    参数:
+        df: 含 word、frequency 列的词频表
+        places: 地名表，见 variant_lookup
+        by: 额外的分组列（如 'year'），None 时只按地名汇总
+    返回:
+        DataFrame: place[, by], frequency，只含词频表中出现过的地名
+    """
+    keys = ['place'] + ([by] if by is not None else [])
+    if exact:
+        matched = df.assign(place=df['word'].map(variant_lookup(places))).dropna(subset=['place'])
+    else:
+        # 自动机只跑一遍不同的词，之后按词合并回词频表
+        mentions = word_mentions(df['word'], build_automaton(places))
+        matched = df[keys[1:] + ['word', 'frequency']].merge(mentions, on='word')
+    return matched.groupby(keys, sort=False, as_index=False)['frequency'].sum()
+
+
+def _unit_vectors(lon, lat):
+    lon, lat = np.radians(lon), np.radians(lat)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def _chord(radius_km):
+    # 球面距离 -> 单位球上的弦长，KD树在三维坐标上按欧氏距离查询
+    return 2 * np.sin(np.minimum(radius_km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+@functools.lru_cache(maxsize=1)
+def _index():
+    """地名表的紧凑数组: (地名数组, (n, 2) 经纬度数组, 单位球坐标上的 KD 树)，只构建一次"""
+    from scipy.spatial import cKDTree
+
+    names = np.array(list(PLACES), dtype=object)
+    coords = np.array([[lon, lat] for _, lon, lat in PLACES.values()], dtype=float).reshape(-1, 2)
+    return names, coords, cKDTree(_unit_vectors(coords[:, 0], coords[:, 1]))
+
+
+def locate(place):
+    """地名或 (经度, 纬度) -> (经度, 纬度)"""
+    if isinstance(place, str):
+        _, lon, lat = PLACES[place]
+        return lon, lat
+    return tuple(place)
+
+
+def distance_km(a, b):
+    """两个地名（或经纬度点）之间的球面距离（公里）"""
+    chord = np.linalg.norm(_unit_vectors(*locate(a)) - _unit_vectors(*locate(b)))
+    return 2 * EARTH_RADIUS_KM * np.arcsin(min(chord / 2, 1.0))
+
+
+def _in_province(names, province):
+    if province is None:
+        return names
+    members = set(PROVINCES[province])
+    return [place_name for place_name in names if place_name in members]
+
+
+def within_radius(center, radius_km, province=None):
+    """
+    与 center 球面距离不超过 radius_km 的地名，按距离由近到远
+    参数:
+        center: 地名或 (经度, 纬度)
+        province: 只保留属于该省/直辖市的地名（见 PROVINCES），None 时不过滤
+    """
+    names, _, tree = _index()
+    point = _unit_vectors(*locate(center))[0]
+    hits = tree.query_ball_point(point, _chord(radius_km) * (1 + 1e-9))
+    distances = np.linalg.norm(tree.data[hits] - point, axis=1)
+    return _in_province(list(names[np.array(hits, dtype=int)[np.argsort(distances, kind='stable')]]), province)
+
+
+def within_bbox(min_lon, min_lat, max_lon, max_lat, province=None):
+    """经纬度范围内的地名（按地名表顺序），province 同 within_radius；先用外接圆在 KD 树上取候选，再精确过滤"""
+    names, coords, tree = _index()
+    center = ((min_lon + max_lon) / 2, (min_lat + max_lat) / 2)
+    corners = _unit_vectors(np.array([min_lon, min_lon, max_lon, max_lon]),
+                            np.array([min_lat, max_lat, min_lat, max_lat]))
+    point = _unit_vectors(*center)[0]
+    hits = np.sort(np.array(tree.query_ball_point(point, np.linalg.norm(corners - point, axis=1).max() * (1 + 1e-9)),
+                            dtype=int))
+    lon, lat = coords[hits, 0], coords[hits, 1]
+    inside = (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+    return _in_province(list(names[hits[inside]]), province)
+
+
+def subset(names):
+    """地名表中指定地名的子表（同 PLACES 的格式），可直接传给绘图和词频函数"""
+    return {place_name: PLACES[place_name] for place_name in names}
+
+
+def coordinates(names=None):
+    """DataFrame: place, longitude, latitude（names 为 None 时是整个地名表）"""
+    all_names, coords, _ = _index()
+    frame = pd.DataFrame({'place': all_names, 'longitude': coords[:, 0], 'latitude': coords[:, 1]})
+    if names is not None:
+        frame = frame.set_index('place').loc[list(names)].reset_index()
+    return frame
@@ -1,10 +1,15 @@
 import networkx as nx
+import numpy as np
 import pandas as pd
 import community as community_louvain
 from collections import defaultdict
-import matplotlib.pyplot as plt
+import cooc
+import corpus
 
 import os
+import pickle
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 
 # INPUT_FILE = r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\newddata\2122_matrix_article.csv"
 OUTPUT_PATH = r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\newdata\2122"
@@ -13,11 +18,77 @@ OUTPUT_PATH = r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dat
 # df_matrix = pd.read_csv(INPUT_FILE, encoding='utf-8-sig')
 # print(df_matrix.head(10))
 
+# 社区划分缓存: 图指纹+参数 -> 划分
+COMMUNITY_CACHE_DIR = os.path.join(corpus.CACHE_DIR, 'communities')
+_partitions = {}
+
+# 共识社区检测默认的Louvain运行次数
+CONSENSUS_RUNS = 8
+
+def _edge_codes(df_matrix):
+    # 两列实体一起编号，并把 (a, b)/(b, a) 统一成 (小编号, 大编号)
+    # 语料表带有实体编码列时按整数编码分解，节点标签只解码一次（顺序与按标签分解相同）
+    if "Entity1_code" in df_matrix and "Entity2_code" in df_matrix:
+        codes, entity_codes = pd.factorize(
+            np.concatenate([df_matrix["Entity1_code"].to_numpy(), df_matrix["Entity2_code"].to_numpy()]))
+        nodes = corpus.decode(entity_codes)
+    else:
+        labels = np.concatenate([df_matrix["Entity1"].to_numpy(), df_matrix["Entity2"].to_numpy()])
+        codes, nodes = pd.factorize(labels)
+    u, v = codes[:len(df_matrix)], codes[len(df_matrix):]
+    return np.minimum(u, v), np.maximum(u, v), nodes
+
+
+def aggregate_edges(df_matrix):
+    """
+    合并无向词对并对重复词对的共现次数求和
+    参数:
+        df_matrix: 含 Entity1, Entity2, CoOccurrence 列的共现表
+    返回:
+        DataFrame: 每个无向词对一行
+    """
+    lo, hi, nodes = _edge_codes(df_matrix)
+    edges = pd.DataFrame({"u": lo, "v": hi, "weight": df_matrix["CoOccurrence"].to_numpy()})
+    edges = edges.groupby(["u", "v"], sort=False, as_index=False)["weight"].sum()
+    return pd.DataFrame({
+        "Entity1": nodes[edges["u"].to_numpy()],
+        "Entity2": nodes[edges["v"].to_numpy()],
+        "CoOccurrence": edges["weight"].to_numpy()
+    })
+
+
+def entity_strength(df_matrix, entity_columns=("Entity1", "Entity2")):
+    """
+    每个实体参与的共现次数之和（把两列实体叠在一起后分组求和，同一行的自共现只计一次）
+    参数:
+        df_matrix: 共现表
+        entity_columns: 两个实体列名，例如编码列 ("Entity1_code", "Entity2_code")
+    返回:
+        Series: 实体 -> 共现次数之和
+    """
+    first, second = entity_columns
+    pair = df_matrix[first].to_numpy() != df_matrix[second].to_numpy()
+    entities = np.concatenate([df_matrix[first].to_numpy(), df_matrix[second].to_numpy()[pair]])
+    weights = np.concatenate([df_matrix["CoOccurrence"].to_numpy(), df_matrix["CoOccurrence"].to_numpy()[pair]])
+    return pd.Series(weights, index=entities).groupby(level=0, sort=False).sum()
+
+
+def generate_sparse_adjacency(df_matrix):
+    """
+    不创建networkx对象，直接构建对称的稀疏邻接矩阵
+    返回:
+        (scipy CSR 邻接矩阵, 节点标签数组)，矩阵的第i行对应 nodes[i]
+    """
+    lo, hi, nodes = _edge_codes(df_matrix)
+    upper = cooc.canonical_csr(lo, hi, df_matrix["CoOccurrence"].to_numpy(), len(nodes))
+    return cooc.symmetric(upper), nodes
+
+
 def generate_undirected_graph(df_matrix):
-    # 创建无向图
+    # 创建无向图（重复词对的权重相加）
+    edges = aggregate_edges(df_matrix)
     G = nx.Graph()
-    for _, row in df_matrix.iterrows():
-        G.add_edge(row["Entity1"], row["Entity2"], weight=row["CoOccurrence"])
+    G.add_weighted_edges_from(zip(edges["Entity1"], edges["Entity2"], edges["CoOccurrence"]))
 
     # 输出图的基本信息
     print("\n网络信息：")
@@ -26,49 +97,289 @@ def generate_undirected_graph(df_matrix):
 
     return G
 def generate_directed(G):
-    degree_centrality = nx.degree_centrality(G)
-    weighted_degree = {node: sum(d["weight"] for _, d in G[node].items()) for node in G.nodes}
+    import centrality
+
+    metrics = centrality.graph_metrics(G)
     # 保存到 CSV 文件
     df_metrics = pd.DataFrame({
-        "Entity": degree_centrality.keys(),
-        "DegreeCentrality": degree_centrality.values(),  # 节点连接数
-        "WeightedDegree": weighted_degree.values()       # 加权度中心性
+        "Entity": metrics["Entity"],
+        "DegreeCentrality": metrics["DegreeCentrality"],  # 节点连接数
+        "WeightedDegree": metrics["WeightedDegree"]       # 加权度中心性
     })
     df_metrics.to_csv(f"{OUTPUT_PATH}\\node_metrics.csv", encoding='utf-8-sig', index=False)
 
     print("\n节点重要性指标已保存到 node_metrics.csv")
 
-def detect_communities(G):
+def graph_fingerprint(G, weight='weight'):
     """
-    使用Louvain算法进行社区检测
+    图内容的哈希（与节点、边的插入顺序无关）
     参数:
-        G: 网络图对象
+        G: 无向网络图对象
+        weight: 边权重属性名，缺失时按1计
     返回:
-        dict: 节点到社区ID的映射
+        str: 十六进制哈希
     """
-    # 需确保networkx版本>=2.0，权重参数正确传递
-    partition = community_louvain.best_partition(G, weight='weight')
-    
-    # 转换为社区ID到节点列表的映射
+    h = hashlib.sha1()
+    h.update('\0'.join(sorted(map(str, G.nodes()))).encode('utf-8'))
+    if G.number_of_edges():
+        edgelist = nx.to_pandas_edgelist(G)
+        source = edgelist['source'].astype(str).to_numpy()
+        target = edgelist['target'].astype(str).to_numpy()
+        swap = source > target
+        edges = pd.DataFrame({
+            'u': np.where(swap, target, source),
+            'v': np.where(swap, source, target),
+            'w': edgelist[weight].fillna(1).astype(float) if weight in edgelist else 1.0
+        }).sort_values(['u', 'v'])
+        h.update(pd.util.hash_pandas_object(edges, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def export_communities(partition, path):
+    """把社区划分保存为CSV（每个社区一行）"""
     community_map = defaultdict(list)
     for node, community_id in partition.items():
-        community_map[community_id].append(node)
-    
-    # 保存社区结果
+        community_map[community_id].append(str(node))
+
     communities_df = pd.DataFrame([
-        {'CommunityID': cid, 'Entities': ', '.join(entities)} 
+        {'CommunityID': cid, 'Entities': ', '.join(entities)}
         for cid, entities in community_map.items()
     ])
-    communities_df.to_csv(f'{OUTPUT_PATH}\\communities.csv',encoding='utf-8-sig', index=False)
-    print("\n社区检测结果已保存到 communities.csv")
-    return partition
+    communities_df.to_csv(path, encoding='utf-8-sig', index=False)
+    print(f"\n社区检测结果已保存到 {path}")
+
+
+def _load_cached_partition(key):
+    path = os.path.join(COMMUNITY_CACHE_DIR, f'{key}.pkl')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _save_cached_partition(key, partition):
+    os.makedirs(COMMUNITY_CACHE_DIR, exist_ok=True)
+    path = os.path.join(COMMUNITY_CACHE_DIR, f'{key}.pkl')
+    tmp_path = path + f'.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(partition, f)
+    os.replace(tmp_path, path)
+
+
+def _memoized(fingerprint, params, compute, use_cache):
+    key = hashlib.sha1(f'{fingerprint}|{params}'.encode('utf-8')).hexdigest()
+    result = None
+    if use_cache:
+        result = _partitions.get(key)
+        if result is None:
+            result = _load_cached_partition(key)
+    if result is None:
+        result = compute()
+        _save_cached_partition(key, result)
+    _partitions[key] = result
+    return result
+
+
+def detect_communities(G, weight='weight', resolution=1.0, random_state=None, export_path=None, use_cache=True,
+                       runs=1, consensus='best', max_workers=None):
+    """
+    使用Louvain算法进行社区检测，结果按图内容和算法参数缓存（进程内 + 磁盘）
+    参数:
+        G: 网络图对象
+        weight, resolution, random_state: 传给 best_partition 的参数
+        export_path: 给定时把结果另存为CSV
+        use_cache: False 时总是重新计算
+        runs: 大于1时改用 consensus_communities（多种子共识，结果可复现）
+        consensus, max_workers: 传给 consensus_communities
+    返回:
+        dict: 节点到社区ID的映射
+    """
+    if runs > 1:
+        partition, _ = consensus_communities(G, runs=runs, method=consensus, weight=weight,
+                                             resolution=resolution, random_state=random_state,
+                                             max_workers=max_workers, use_cache=use_cache)
+    else:
+        # 需确保networkx版本>=2.0，权重参数正确传递
+        partition = _memoized(
+            graph_fingerprint(G, weight), f'louvain|{weight}|{resolution}|{random_state}',
+            lambda: community_louvain.best_partition(G, weight=weight, resolution=resolution,
+                                                     random_state=random_state),
+            use_cache)
+
+    if export_path is not None:
+        export_communities(partition, export_path)
+    # 返回副本，调用方修改不会污染缓存
+    return dict(partition)
+
+
+def _louvain_run(G, weight, resolution, seed):
+    # 进程池中的一次带种子的Louvain运行，返回 (划分, 模块度)
+    partition = community_louvain.best_partition(G, weight=weight, resolution=resolution, random_state=seed)
+    return partition, community_louvain.modularity(partition, G, weight=weight)
+
+
+def _canonical_labels(partition):
+    """按社区大小（降序）和社区内最小节点名重新编号，使同一划分总得到同样的ID"""
+    members = defaultdict(list)
+    for node, cid in partition.items():
+        members[cid].append(str(node))
+    order = sorted(members, key=lambda cid: (-len(members[cid]), min(members[cid])))
+    mapping = {cid: i for i, cid in enumerate(order)}
+    return {node: mapping[cid] for node, cid in partition.items()}
+
+
+def _node_stability(nodes, final, runs):
+    """
+    每个节点所在社区在各次运行中的 Jaccard 一致性的平均值
+    (1 表示每次运行都得到完全相同的社区)
+    """
+    final_labels = pd.Series([final[node] for node in nodes])
+    final_sizes = final_labels.map(final_labels.value_counts()).to_numpy()
+    total = np.zeros(len(nodes))
+    for partition in runs:
+        run_labels = pd.Series([partition[node] for node in nodes])
+        run_sizes = run_labels.map(run_labels.value_counts()).to_numpy()
+        pairs = pd.DataFrame({'f': final_labels, 'r': run_labels})
+        overlap = pairs.groupby(['f', 'r'])['f'].transform('size').to_numpy()
+        total += overlap / (final_sizes + run_sizes - overlap)
+    return dict(zip(nodes, total / len(runs)))
+
+
+def _coassociation_partition(G, runs, weight, resolution, threshold):
+    # 在原图的边上统计两端点被分到同一社区的比例，去掉低于阈值的边后再做一次Louvain
+    # 新图的边权 = 比例 × 原图中调用方指定的权重（缺失时按1计）
+    C = nx.Graph()
+    C.add_nodes_from(G.nodes())
+    for u, v, data in G.edges(data=True):
+        together = sum(partition[u] == partition[v] for partition in runs) / len(runs)
+        if together >= threshold:
+            C.add_edge(u, v, coassociation=together * data.get(weight, 1))
+    return community_louvain.best_partition(C, weight='coassociation', resolution=resolution, random_state=0)
+
+
+def consensus_communities(G, runs=CONSENSUS_RUNS, method='best', weight='weight', resolution=1.0,
+                          random_state=None, threshold=0.5, max_workers=None, use_cache=True):
+    """
+    多种子共识社区检测：在进程池中并行运行 runs 次带种子的Louvain
+    参数:
+        G: 网络图对象
+        runs: 运行次数，种子为 random_state (默认0) 起的连续整数
+        method: 'best' 保留模块度最高的一次; 'coassociation' 对共现比例 >= threshold 的边再做一次聚类
+        max_workers: 进程数，1 时在当前进程内顺序运行；已经在进程池中运行的调用方（如流水线的各阶段）应传 1
+    返回:
+        (dict 节点->社区ID, dict 节点->稳定性[0, 1])，社区ID按社区大小编号
+    """
+    if method not in ('best', 'coassociation'):
+        raise ValueError(f"unknown consensus method: {method}")
+    base = 0 if random_state is None else random_state
+    seeds = list(range(base, base + runs))
+
+    def compute():
+        if max_workers == 1 or runs == 1:
+            results = [_louvain_run(G, weight, resolution, seed) for seed in seeds]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(_louvain_run, [G] * runs, [weight] * runs, [resolution] * runs, seeds))
+        partitions = [partition for partition, _ in results]
+        if method == 'best':
+            # 模块度相同时取种子最小的一次，保证结果确定
+            best = max(range(runs), key=lambda i: (results[i][1], -i))
+            final = partitions[best]
+        else:
+            final = _coassociation_partition(G, partitions, weight, resolution, threshold)
+        final = _canonical_labels(final)
+        return final, _node_stability(list(G.nodes()), final, partitions)
+
+    partition, stability = _memoized(
+        graph_fingerprint(G, weight), f'consensus|{method}|{runs}|{weight}|{resolution}|{base}|{threshold}|2',
+        compute, use_cache)
+    return dict(partition), dict(stability)
+
+
+def match_communities(partition, previous, next_id):
+    """
+    把新划分的社区ID对齐到上一时期: 按共享节点的重叠数做最大重叠的一一匹配
+    参数:
+        partition: 本时期 节点->社区
+        previous: 上一时期 节点->社区 (已对齐的ID)
+        next_id: 未曾使用过的最小ID，未匹配上的新社区从这里开始编号
+    返回:
+        (对齐后的 节点->社区, 新的 next_id)
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    current_ids = sorted(set(partition.values()))
+    previous_ids = sorted(set(previous.values()))
+    row = {cid: i for i, cid in enumerate(current_ids)}
+    col = {cid: j for j, cid in enumerate(previous_ids)}
+    overlap = np.zeros((len(current_ids), len(previous_ids)))
+    for node, cid in partition.items():
+        if node in previous:
+            overlap[row[cid], col[previous[node]]] += 1
+
+    mapping = {}
+    if overlap.size:
+        rows, cols = linear_sum_assignment(overlap, maximize=True)
+        for i, j in zip(rows, cols):
+            if overlap[i, j] > 0:
+                mapping[current_ids[i]] = previous_ids[j]
+    # 没有延续关系的社区按大小依次分配新ID
+    sizes = pd.Series(list(partition.values())).value_counts()
+    for cid in sorted(current_ids, key=lambda c: (-sizes[c], c)):
+        if cid not in mapping:
+            mapping[cid] = next_id
+            next_id += 1
+    return {node: mapping[cid] for node, cid in partition.items()}, next_id
+
+
+def temporal_communities(G, previous=None, next_id=None, weight='weight', resolution=1.0, random_state=0,
+                         use_cache=True, max_workers=None):
+    """
+    时序社区检测: 以上一时期的划分为初始状态运行Louvain，再把社区ID按最大重叠延续下来
+    参数:
+        G: 本时期的网络图
+        previous: 上一时期 temporal_communities 返回的划分；None 表示第一个时期（使用共识划分）
+        next_id: 上一时期返回的 next_id
+        max_workers: 第一个时期的共识划分使用的进程数，见 consensus_communities
+    返回:
+        (dict 节点->社区ID, next_id)，社区ID在各时期间可比较
+    """
+    if previous is None:
+        partition, _ = consensus_communities(G, weight=weight, resolution=resolution, use_cache=use_cache,
+                                             max_workers=max_workers)
+        return partition, max(partition.values(), default=-1) + 1
+
+    if next_id is None:
+        next_id = max(previous.values(), default=-1) + 1
+    # 共享节点沿用上期社区，新节点各自成为一个社区
+    init = {}
+    fresh = next_id
+    for node in G.nodes():
+        if node in previous:
+            init[node] = previous[node]
+        else:
+            init[node] = fresh
+            fresh += 1
+
+    fingerprint = graph_fingerprint(G, weight) + '|' + hashlib.sha1(
+        repr(sorted(init.items(), key=lambda item: str(item[0]))).encode('utf-8')).hexdigest()
+    partition = _memoized(
+        fingerprint, f'warm-louvain|{weight}|{resolution}|{random_state}',
+        lambda: community_louvain.best_partition(G, partition=init, weight=weight, resolution=resolution,
+                                                 random_state=random_state),
+        use_cache)
+    return match_communities(partition, previous, next_id)
+
 
 def generate_directed_graph(G, partition):
+    import matplotlib.pyplot as plt
+    from layout import cached_layout
+
     # 设置画布大小
     plt.figure(figsize=(12, 8))
 
-    # 使用 spring_layout 布局（模拟物理系统）
-    pos = nx.spring_layout(G, k=0.5)  # k 控制节点间距
+    # 力导向布局（四叉树斥力 + 多层粗化，模拟物理系统）
+    pos = cached_layout(G, name='directed_graph', k=0.5, seed=42)  # k 控制节点间距
 
     # 设置节点颜色（按社区）
     community_colors = ["#FF9999", "#66B2FF", "#99FF99", "#FFD700"]  # 颜色列表
@@ -54,43 +54,14 @@
 # plt.show()
 
 
-import pandas as pd
+import cooc
 
-# 定义年份列表
-years = ['2122', '2223', '2324', '2425']
+# 共现值总数的筛选阈值
+THRESHOLD = 6000
 
-# 存储每个年份的数据
-dataframes = {}
-
-# 读取数据并存储在字典中
-for year in years:
-    file_path = rf"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\newdata\{year}_matrix_article.csv"
-    dataframes[year] = pd.read_csv(file_path)
-
-# 合并所有数据集，并添加年份列
-merged_data = pd.concat([df.assign(year=year) for year, df in dataframes.items()], ignore_index=True)
-
-# 创建一个透视表，按实体对汇总CoOccurrence值
-pivot_table = merged_data.pivot_table(index='Entity1', columns='Entity2', values='CoOccurrence', aggfunc='sum', fill_value=0)
-
-# 将透视表转换为长格式以便更容易筛选
-long_format = pivot_table.stack().reset_index()
-long_format.columns = ['Entity1', 'Entity2', 'Total_CoOccurrence']
-
-# 提取共现值总数在6000以上的词对
-filtered_pairs = long_format[long_format['Total_CoOccurrence'] > 6000]
+# 在稀疏共现存储的全部年份合计切片上查询（只遍历非零元素，不生成透视表）
+# 同一词对的 (A, B) 与 (B, A) 合并计数，并附加每个年份的共现次数
+filtered_pairs = cooc.pairs(threshold=THRESHOLD, by_year=True).rename(columns={'CoOccurrence': 'Total_CoOccurrence'})
 
 # 打印结果
 print(filtered_pairs)
-
-
-
-
-
-
-
-
-
-
-
-
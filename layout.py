@@ -0,0 +1,340 @@
+import os
+import math
+import pickle
+import hashlib
+import numpy as np
+import networkx as nx
+import scipy.sparse as sp
+
+# 节点数不超过该值时直接计算全部点对斥力
+DIRECT_REPULSION_NODES = 256
+# 多层粗化到不超过这么多节点为止
+COARSEST_NODES = 64
+# 一次粗化后节点数高于这个比例时认为粗化无效，停止
+MIN_COARSEN_RATIO = 0.9
+# 四叉树最细一层每个格子的平均节点数
+LEAF_OCCUPANCY = 4
+MAX_DEPTH = 10
+# 从粗一层展开后的细化迭代次数
+REFINE_ITERATIONS = 20
+
+
+def _adjacency(G, nodes, weight):
+    A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight=weight, format='csr', dtype=float)
+    # 自环不影响布局
+    A = sp.csr_matrix(A - sp.diags(A.diagonal()))
+    A.eliminate_zeros()
+    return A
+
+
+def _coarsen(A, mass, rng):
+    """
+    重边匹配: 每个未匹配节点选权重/质量最大的未匹配邻居，互相选中的节点对合并，重复几轮
+    返回:
+        (粗图邻接矩阵, 粗图节点质量, 细->粗的聚合矩阵P)
+    """
+    n = A.shape[0]
+    match = np.full(n, -1)
+    coo = A.tocoo()
+    # 归一化的边权，加一点随机扰动打破平局（由种子决定）
+    score = coo.data / (mass[coo.row] * mass[coo.col]) * (1 + 1e-6 * rng.random(len(coo.data)))
+    for _ in range(4):
+        free = match < 0
+        keep = free[coo.row] & free[coo.col]
+        if not keep.any():
+            break
+        S = sp.csr_matrix((score[keep], (coo.row[keep], coo.col[keep])), shape=(n, n))
+        best = np.asarray(S.argmax(axis=1)).ravel()
+        has = np.asarray(S.max(axis=1).todense()).ravel() > 0
+        mutual = has & free & (best[best] == np.arange(n))
+        match[mutual] = best[mutual]
+
+    # 未匹配的节点单独成为粗节点
+    single = match < 0
+    match[single] = np.flatnonzero(single)
+    representative = np.minimum(np.arange(n), match)
+    _, coarse = np.unique(representative, return_inverse=True)
+    P = sp.csr_matrix((np.ones(n), (np.arange(n), coarse)), shape=(n, coarse.max() + 1))
+    Ac = sp.csr_matrix(P.T @ A @ P)
+    Ac = sp.csr_matrix(Ac - sp.diags(Ac.diagonal()))
+    Ac.eliminate_zeros()
+    return Ac, P.T @ mass, P
+
+
+def _far_offsets():
+    # 按节点所在格子在父格子中的位置(x奇偶, y奇偶)，列出父格子3x3邻域中与本格子不相邻的27个子格子的偏移
+    table = np.zeros((2, 2, 27, 2), dtype=np.int64)
+    for px in (0, 1):
+        for py in (0, 1):
+            offsets = [(dx, dy) for dx in range(-2 - px, 4 - px) for dy in range(-2 - py, 4 - py)
+                       if abs(dx) > 1 or abs(dy) > 1]
+            table[px, py] = offsets
+    return table
+
+
+FAR_OFFSETS = _far_offsets()
+
+
+def _direct_repulsion(z, mass, k2, min_d2):
+    # 坐标用复数表示: 斥力 k^2 * m * delta / |delta|^2 = k^2 * m / conj(delta)
+    delta = z[:, None] - z[None, :]
+    d2 = np.maximum(np.abs(delta) ** 2, min_d2)
+    np.fill_diagonal(d2, np.inf)
+    return k2 * (delta * (mass[None, :] / d2)).sum(axis=1)
+
+
+def _grid_repulsion(z, mass, k2, min_d2):
+    """
+    Barnes-Hut 式近似: 按层构建完整四叉树（每层用 bincount 求格子的质量和质心）
+    每层中与节点所在格子不相邻、但父格子相邻的格子视为足够远，按质心一次计算；
+    最细一层相邻格子中的节点逐对精确计算
+    """
+    n = len(z)
+    depth = int(min(MAX_DEPTH, max(2, math.ceil(math.log(max(n / LEAF_OCCUPANCY, 1), 4)))))
+    lo = complex(z.real.min(), z.imag.min())
+    span = max(np.ptp(z.real), np.ptp(z.imag), 1e-12) * (1 + 1e-9)
+    top = (1 << depth) - 1
+    leaf_x = np.minimum(((z.real - lo.real) / span * (1 << depth)).astype(np.int64), top)
+    leaf_y = np.minimum(((z.imag - lo.imag) / span * (1 << depth)).astype(np.int64), top)
+    force = np.zeros(n, dtype=complex)
+
+    for level in range(2, depth + 1):
+        size = 1 << level
+        cx, cy = leaf_x >> (depth - level), leaf_y >> (depth - level)
+        cell = cx * size + cy
+        # 多放一个质量为0的格子，越界的偏移都指向它
+        cell_mass = np.bincount(cell, weights=mass, minlength=size * size + 1)
+        cell_z = np.bincount(cell, weights=mass * z.real, minlength=size * size + 1) \
+            + 1j * np.bincount(cell, weights=mass * z.imag, minlength=size * size + 1)
+
+        offsets = FAR_OFFSETS[cx & 1, cy & 1]
+        X = cx[:, None] + offsets[:, :, 0]
+        Y = cy[:, None] + offsets[:, :, 1]
+        target = np.where((X >= 0) & (X < size) & (Y >= 0) & (Y < size), X * size + Y, size * size)
+        m = cell_mass[target]
+        occupied = m > 0
+        delta = np.where(occupied, z[:, None] - cell_z[target] / np.where(occupied, m, 1), 1)
+        d2 = np.maximum(np.abs(delta) ** 2, min_d2)
+        force += k2 * (delta * (m / d2)).sum(axis=1)
+
+    # 最细一层: 相邻格子内逐对计算
+    size = 1 << depth
+    cell = leaf_x * size + leaf_y
+    order = np.argsort(cell, kind='stable')
+    counts = np.bincount(cell, minlength=size * size)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            bx, by = leaf_x + dx, leaf_y + dy
+            valid = (bx >= 0) & (bx <= top) & (by >= 0) & (by <= top)
+            source = np.flatnonzero(valid)
+            neighbour = bx[valid] * size + by[valid]
+            repeat = counts[neighbour]
+            i = np.repeat(source, repeat)
+            first = np.repeat(starts[neighbour] - np.cumsum(repeat) + repeat, repeat)
+            j = order[first + np.arange(len(i))]
+            keep = i != j
+            i, j = i[keep], j[keep]
+            delta = z[i] - z[j]
+            d2 = np.maximum(np.abs(delta) ** 2, min_d2)
+            contribution = delta * (k2 * mass[j] / d2)
+            force += np.bincount(i, weights=contribution.real, minlength=n) \
+                + 1j * np.bincount(i, weights=contribution.imag, minlength=n)
+    return force
+
+
+def _refine(A, mass, z, k, iterations, temperature, threshold):
+    """Fruchterman-Reingold 迭代，线性降温；平均位移低于 threshold×布局尺寸 时提前停止"""
+    coo = A.tocoo()
+    rows, cols, w = coo.row, coo.col, coo.data
+    n = len(z)
+    k2 = k * k
+    min_d2 = (0.01 * k) ** 2
+    dt = temperature / (iterations + 1)
+    for _ in range(iterations):
+        if n <= DIRECT_REPULSION_NODES:
+            force = _direct_repulsion(z, mass, k2, min_d2)
+        else:
+            force = _grid_repulsion(z, mass, k2, min_d2)
+        # 吸引力: 沿边 -delta * w * d / k
+        delta = z[rows] - z[cols]
+        pull = delta * (w * np.abs(delta) / k)
+        force -= np.bincount(rows, weights=pull.real, minlength=n) + 1j * np.bincount(rows, weights=pull.imag, minlength=n)
+
+        length = np.abs(force)
+        step = force * (np.minimum(length, temperature) / np.maximum(length, 1e-12))
+        z = z + step
+        temperature -= dt
+        extent = max(np.ptp(z.real), np.ptp(z.imag), 1e-12)
+        if np.abs(step).mean() < threshold * extent:
+            break
+    return z
+
+
+def _random_points(rng, count, side):
+    points = rng.random((count, 2)) * side
+    return points[:, 0] + 1j * points[:, 1]
+
+
+def _rescale(z, scale, center):
+    z = z - z.mean()
+    lim = max(np.abs(z.real).max(), np.abs(z.imag).max())
+    if lim > 0:
+        z = z * (scale / lim)
+    return np.column_stack([z.real, z.imag]) + center
+
+
+def _initial_coords(A, nodes, pos, k, rng):
+    """给定坐标的节点直接使用；其余节点放在已定位邻居的平均位置附近，没有已定位邻居时随机放置"""
+    n = len(nodes)
+    z = np.zeros(n, dtype=complex)
+    known = np.zeros(n, dtype=bool)
+    for index, node in enumerate(nodes):
+        if node in pos:
+            z[index] = complex(pos[node][0], pos[node][1])
+            known[index] = True
+    if known.all():
+        return z
+    side = max(np.ptp(z.real[known]), np.ptp(z.imag[known]), k) if known.any() else k * math.sqrt(n)
+    lo = complex(z.real[known].min(), z.imag[known].min()) if known.any() else 0
+    neighbours = A.astype(bool).astype(float) @ known.astype(float)
+    neighbour_sum = A.astype(bool).astype(float) @ np.where(known, z, 0)
+    placed = ~known & (neighbours > 0)
+    z[placed] = neighbour_sum[placed] / neighbours[placed]
+    jitter = _random_points(rng, n, 0.1 * k) - (0.05 + 0.05j) * k
+    z[placed] += jitter[placed]
+    free = ~known & ~placed
+    z[free] = lo + _random_points(rng, int(free.sum()), side)
+    return z
+
+
+def _layout_coords(G, nodes, k, iterations, seed, weight, pos, temperature, threshold):
+    # 未缩放的布局坐标（复数）
+    n = len(nodes)
+    rng = np.random.default_rng(seed)
+    side = k * math.sqrt(n)
+    A = _adjacency(G, nodes, weight)
+    mass = np.ones(n)
+
+    if pos is not None:
+        z = _initial_coords(A, nodes, pos, k, rng)
+        if temperature is None:
+            temperature = 0.1 * max(np.ptp(z.real), np.ptp(z.imag), k)
+        return _refine(A, mass, z, k, iterations, temperature, threshold)
+
+    # 多层粗化
+    levels = [(A, mass, None)]
+    while levels[-1][0].shape[0] > COARSEST_NODES:
+        Ac, mc, P = _coarsen(levels[-1][0], levels[-1][1], rng)
+        if Ac.shape[0] > MIN_COARSEN_RATIO * levels[-1][0].shape[0]:
+            break
+        levels.append((Ac, mc, P))
+
+    coarse_A, coarse_mass, _ = levels[-1]
+    z = _refine(coarse_A, coarse_mass, _random_points(rng, coarse_A.shape[0], side), k, iterations,
+                0.1 * side, threshold)
+    for index in range(len(levels) - 1, 0, -1):
+        fine_A, fine_mass, _ = levels[index - 1]
+        P = levels[index][2]
+        # 子节点放在父节点附近，再做局部细化
+        z = P @ z + (_random_points(rng, P.shape[0], 0.1 * k) - (0.05 + 0.05j) * k)
+        z = _refine(fine_A, fine_mass, z, k, min(iterations, REFINE_ITERATIONS), k, threshold)
+    return z
+
+
+def force_layout(G, k=None, iterations=50, seed=None, weight='weight', pos=None, scale=1, center=None,
+                 threshold=1e-4, temperature=None):
+    """
+    力导向布局，可直接替换 nx.spring_layout(G, k=..., iterations=..., seed=...)
+    多层粗化（重边匹配）后从最粗的图开始布局，逐层展开并细化；斥力用四叉树近似，
+    所以大图每次迭代接近 O(n log n)。给定 seed 时结果确定
+    参数:
+        k: 理想边长，默认 1/sqrt(n)
+        iterations: 最粗一层的最大迭代次数，更细的层从展开的坐标出发，只做 REFINE_ITERATIONS 次局部细化
+        pos: 初始坐标 {节点: (x, y)}；给出时跳过粗化，直接从这些坐标开始细化（缺少坐标的节点放在邻居附近）
+        threshold: 平均位移相对布局尺寸低于该值时停止
+        temperature: 给出 pos 时第一次迭代的最大位移，默认为布局尺寸的 0.1
+    返回:
+        dict: 节点 -> np.array([x, y])，缩放到 [-scale, scale] 并以 center 为中心
+    """
+    nodes = list(G.nodes())
+    n = len(nodes)
+    center = np.zeros(2) if center is None else np.asarray(center, dtype=float)
+    if n == 0:
+        return {}
+    if n == 1:
+        return {nodes[0]: center}
+
+    k = 1 / math.sqrt(n) if k is None else k
+    z = _layout_coords(G, nodes, k, iterations, seed, weight, pos, temperature, threshold)
+    return dict(zip(nodes, _rescale(z, scale, center)))
+
+
+def _cache_path(*parts):
+    import corpus
+    return os.path.join(corpus.CACHE_DIR, 'layouts', *parts)
+
+
+def _load_positions(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _save_positions(path, positions):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + f'.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(positions, f)
+    os.replace(tmp_path, path)
+
+
+def cached_layout(G, name=None, k=None, iterations=50, seed=None, weight='weight', scale=1, center=None,
+                  min_overlap=0.5, use_cache=True):
+    """
+    带持久缓存的 force_layout
+    同一个图（按 gen_net.graph_fingerprint）和参数直接返回保存的坐标，不再计算。
+    给出 name 时，每次的结果还会记为该名字下的最新布局；图只有少量变化（新的年份、新增节点）、
+    且与最新布局共享至少 min_overlap 的节点时，从这些坐标出发只做 REFINE_ITERATIONS 次局部细化，
+    所以节点在多次构建和各年份之间基本保持原位。
+    热启动的结果取决于作为起点的布局，所以缓存键里包含起点布局的键：同一个键总是对应同一个结果
+    """
+    from gen_net import graph_fingerprint
+
+    nodes = list(G.nodes())
+    n = len(nodes)
+    center = np.zeros(2) if center is None else np.asarray(center, dtype=float)
+    if n <= 1:
+        return force_layout(G, center=center)
+    k = 1 / math.sqrt(n) if k is None else k
+
+    base = hashlib.sha1(
+        f'{graph_fingerprint(G, weight)}|{k}|{iterations}|{seed}|{weight}|{name}'.encode('utf-8')).hexdigest()
+    family_path = _cache_path('latest', f'{hashlib.sha1(str(name).encode("utf-8")).hexdigest()}.pkl')
+
+    # 最新布局记为 (图和参数的键, 布局的键, 坐标)
+    latest = _load_positions(family_path) if use_cache and name is not None else None
+    if not isinstance(latest, tuple):
+        latest = None
+    if latest is not None and latest[0] == base:
+        # 图和参数都没变：沿用当前布局
+        key, raw = latest[1], latest[2]
+    else:
+        warm = latest is not None and sum(node in latest[2] for node in nodes) >= min_overlap * n
+        key = hashlib.sha1(f'{base}|{latest[1] if warm else None}'.encode('utf-8')).hexdigest()
+        exact_path = _cache_path(f'{key}.pkl')
+        raw = _load_positions(exact_path) if use_cache else None
+        if raw is None:
+            if warm:
+                # 热启动: 从上次的坐标出发做局部细化
+                z = _layout_coords(G, nodes, k, REFINE_ITERATIONS, seed, weight, latest[2], k, 1e-4)
+            else:
+                z = _layout_coords(G, nodes, k, iterations, seed, weight, None, None, 1e-4)
+            raw = {node: (value.real, value.imag) for node, value in zip(nodes, z)}
+            _save_positions(exact_path, raw)
+    if name is not None:
+        _save_positions(family_path, (base, key, raw))
+
+    z = np.array([complex(*raw[node]) for node in nodes])
+    return dict(zip(nodes, _rescale(z, scale, center)))
@@ -1,23 +1,26 @@
 import pandas as pd
 import networkx as nx
 import plotly.graph_objects as go
-from community import community_louvain
 import numpy as np
+from gen_net import generate_undirected_graph, detect_communities
+from layout import cached_layout
+from backbone import backbone_edges
+
+# 最多绘制的边数（超出时只保留骨干边）
+MAX_EDGES = 500
 
 # 1. 导入数据
 df = pd.read_csv(r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\newdata\2122_matrix_article.csv")
 
 # 2. 构建网络
-G = nx.Graph()
-for _, row in df.iterrows():
-    G.add_edge(row['Entity1'], row['Entity2'], weight=row['CoOccurrence'])
+G = generate_undirected_graph(df)
 
 # 3. 计算社区（Louvain算法）
-partition = community_louvain.best_partition(G)
+partition = detect_communities(G)
 communities = list(set(partition.values()))
 
 # 4. 准备绘图数据
-pos = nx.spring_layout(G, k=0.5, iterations=50)  # 使用二维布局
+pos = cached_layout(G, name='ordinary_force_directed', k=0.5, iterations=50, seed=42)  # 使用二维布局（坐标持久缓存）
 
 node_x = [pos[node][0] for node in G.nodes()]
 node_y = [pos[node][1] for node in G.nodes()]
@@ -41,11 +44,12 @@ node_trace = go.Scatter(
     )
 )
 
-# 6. 绘制边
+# 6. 绘制边（边数超过 MAX_EDGES 时只画 disparity p 值最小的 MAX_EDGES 条）
+edges = backbone_edges(df, method='disparity', alpha=None, max_edges=MAX_EDGES)
 edge_x, edge_y = [], []
-for edge in G.edges():
-    x0, y0 = pos[edge[0]]
-    x1, y1 = pos[edge[1]]
+for source, target in zip(edges['Entity1'], edges['Entity2']):
+    x0, y0 = pos[source]
+    x1, y1 = pos[target]
     edge_x.extend([x0, x1, None])
     edge_y.extend([y0, y1, None])
 
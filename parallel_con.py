@@ -3,9 +3,12 @@ import numpy as np
 import plotly.graph_objects as go
 from gen_net import generate_undirected_graph, detect_communities
 import plotly.express as px
+import corpus
 
-# 定义年份列表
-years = ['2122', '2223', '2324', '2425']
+DATA_DIR = r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\newdata"
+
+# 定义年份列表（从数据目录中发现）
+years = corpus.discover_periods(DATA_DIR)
 
 # 存储每个年份的数据和分区信息
 dataframes = {}
@@ -13,7 +16,7 @@ partitions = {}
 
 # 读取数据并生成社区划分
 for year in years:
-    file_path = f"C:/Users/w1782/Desktop/大一下作业/数据可视化作业/dataset/newdata/{year}_matrix_article.csv"
+    file_path = rf"{DATA_DIR}\{year}_matrix_article.csv"
     dataframes[year] = pd.read_csv(file_path)
 
     # 生成无向图并检测社区
@@ -81,15 +81,21 @@
 #
 # plt.tight_layout()
 import os
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 import networkx as nx
-from collections import defaultdict
 import plotly.express as px
-import community.community_louvain as community_louvain
+import corpus
+from gen_net import detect_communities
 
 # 定义输出路径
 OUTPUT_PATH = r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\output"
 
+# 相似度图: 每个词连接的最相似词数，以及分块计算时每块的行数（控制内存）
+KNN_NEIGHBORS = 10
+KNN_BLOCK_ROWS = 512
+
 
 # 1. 读取并合并四个CSV文件
 def read_and_combine_csvs(file_paths):
@@ -136,48 +142,62 @@ def process_place_frequencies(df):
     return combined_result_df
 
 
-# 3. 社区检测
-def detect_communities(G):
+# 3. 社区检测: 使用 gen_net.detect_communities（结果按图内容缓存）
+
+
+def knn_similarity_edges(X, k=KNN_NEIGHBORS, metric='cosine', block_rows=KNN_BLOCK_ROWS):
     """
-    使用Louvain算法进行社区检测
+    k近邻相似度图的边
     参数:
-        G: 网络图对象
+        X: 每行一个词的特征向量（各年份词频）
+        k: 每个词保留的最相似词数
+        metric: 'cosine' 或 'correlation'（先按行去均值再算余弦）
+        block_rows: 每次计算 block_rows × n 的相似度块，内存不随 n² 增长
     返回:
-        dict: 节点到社区ID的映射
+        (i, j, similarity): 无向边 i < j；两端任一方把对方列为近邻即保留，只保留正相似度
     """
-    # 需确保networkx版本>=2.0，权重参数正确传递
-    partition = community_louvain.best_partition(G, weight='weight')
-
-    # 转换为社区ID到节点列表的映射
-    community_map = defaultdict(list)
-    for node, community_id in partition.items():
-        community_map[community_id].append(node)
-
-    # 保存社区结果
-    communities_df = pd.DataFrame([
-        {'CommunityID': cid, 'Entities': ', '.join(entities)}
-        for cid, entities in community_map.items()
-    ])
-    communities_df.to_csv(os.path.join(OUTPUT_PATH, 'communities.csv'), encoding='utf-8-sig', index=False)
-    print("\n社区检测结果已保存到 communities.csv")
-    return partition
+    X = np.asarray(X, dtype=float)
+    if metric == 'correlation':
+        X = X - X.mean(axis=1, keepdims=True)
+    elif metric != 'cosine':
+        raise ValueError(f"unknown similarity metric: {metric}")
+    n = len(X)
+    k = min(k, n - 1)
+    if k <= 0:
+        return np.array([], dtype=int), np.array([], dtype=int), np.array([])
+
+    norms = np.linalg.norm(X, axis=1)
+    X = X / np.where(norms > 0, norms, 1)[:, None]
+    rows, cols, values = [], [], []
+    for start in range(0, n, block_rows):
+        stop = min(start + block_rows, n)
+        S = X[start:stop] @ X.T
+        S[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        nearest = np.argpartition(-S, k - 1, axis=1)[:, :k]
+        rows.append(np.repeat(np.arange(start, stop), k))
+        cols.append(nearest.ravel())
+        values.append(np.take_along_axis(S, nearest, axis=1).ravel())
+
+    rows, cols, values = np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+    positive = values > 0
+    M = sp.csr_matrix((values[positive], (rows[positive], cols[positive])), shape=(n, n))
+    upper = sp.triu(M.maximum(M.T), k=1).tocoo()
+    return upper.row, upper.col, upper.data
 
 
 # 4. 构建网络图并进行社区检测
-def build_network_and_detect_communities(place_freq_df):
-    G = nx.Graph()
-
-    for _, row in place_freq_df.iterrows():
-        word = row['word']
-        for year in ['2122', '2223', '2324', '2425']:
-            if year in row:
-                G.add_node(word, year=year, frequency=row[year])
-                G.nodes[word]['weight'] = row[year]
+def build_network_and_detect_communities(place_freq_df, k=KNN_NEIGHBORS):
+    # 以各年份词频向量的余弦相似度构建k近邻图，而不是所有词两两相连的完全图
+    years = [c for c in place_freq_df.columns if c != 'word']
+    words = place_freq_df['word'].to_numpy()
+    frequencies = place_freq_df[years].fillna(0).to_numpy(dtype=float)
 
-    edges = [(u, v) for u in G.nodes() for v in G.nodes() if u != v]
-    G.add_edges_from(edges, weight=1)
+    G = nx.Graph()
+    G.add_nodes_from(words)
+    i, j, similarity = knn_similarity_edges(frequencies, k)
+    G.add_weighted_edges_from(zip(words[i], words[j], similarity))
 
-    partition = detect_communities(G)
+    partition = detect_communities(G, export_path=os.path.join(OUTPUT_PATH, 'communities.csv'))
     return partition
 
 
@@ -187,16 +207,13 @@ def plot_parallel_coordinates(place_freq_df, partition):
     place_freq_df['CommunityID'] = place_freq_df['word'].map(partition)
 
     # 重命名列以便于绘图
-    place_freq_df.rename(columns={
-        '2122': 'Year_2021_2022',
-        '2223': 'Year_2022_2023',
-        '2324': 'Year_2023_2024',
-        '2425': 'Year_2024_2025'
-    }, inplace=True)
+    periods = sorted(c for c in place_freq_df.columns if c not in ('word', 'CommunityID'))
+    dimensions = {year: 'Year_' + corpus.period_label(year).replace('-', '_') for year in periods}
+    place_freq_df.rename(columns=dimensions, inplace=True)
 
     fig = px.parallel_coordinates(
         place_freq_df,
-        dimensions=['Year_2021_2022', 'Year_2022_2023', 'Year_2023_2024', 'Year_2024_2025'],
+        dimensions=list(dimensions.values()),
         color='CommunityID',
         labels={'CommunityID': 'Community'},
         title='G60科创走廊长三角地区地名词频变化 (2021-2025)'
@@ -207,12 +224,8 @@ def plot_parallel_coordinates(place_freq_df, partition):
 
 # 主程序
 def main():
-    file_paths = [
-        r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\newdata\2122_t_f.csv",
-        r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\newdata\2223_t_f.csv",
-        r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\newdata\2324_t_f.csv",
-        r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\newdata\2425_t_f.csv"
-    ]
+    data_dir = r"C:\Users\w1782\Desktop\大一下作业\数据可视化作业\dataset\newdata"
+    file_paths = [rf"{data_dir}\{year}_t_f.csv" for year in corpus.discover_periods(data_dir)]
 
     try:
         print("正在读取CSV文件...")
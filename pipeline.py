@@ -0,0 +1,60 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+
+class Stage:
+    """One unit of work: func(*args) runs once every stage named in deps has finished
+
+    func must be a module-level function so it can be sent to a worker process. Stages share
+    data through the on-disk caches (corpus, cooc, period artifacts), not through return values.
+    """
+
+    def __init__(self, name, func, args=(), deps=()):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.deps = tuple(deps)
+
+
+def _check(stages):
+    for stage in stages.values():
+        missing = [dep for dep in stage.deps if dep not in stages]
+        if missing:
+            raise ValueError(f"stage {stage.name!r} depends on unknown stage(s): {', '.join(missing)}")
+
+
+def _ready(pending, results):
+    return [stage for stage in pending.values() if all(dep in results for dep in stage.deps)]
+
+
+def run(stages, max_workers=None):
+    """Run stages in dependency order, independent ones in parallel; return {name: result}
+
+    Each stage runs exactly once even if many stages depend on it. max_workers=1 runs
+    everything in the current process.
+    """
+    pending = {stage.name: stage for stage in stages}
+    _check(pending)
+    results = {}
+
+    if max_workers == 1:
+        while pending:
+            ready = _ready(pending, results)
+            if not ready:
+                raise ValueError(f"dependency cycle among stages: {', '.join(pending)}")
+            for stage in ready:
+                results[stage.name] = stage.func(*stage.args)
+                del pending[stage.name]
+        return results
+
+    running = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for stage in _ready(pending, results):
+                running[pool.submit(stage.func, *stage.args)] = stage.name
+                del pending[stage.name]
+            if not running:
+                raise ValueError(f"dependency cycle among stages: {', '.join(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
@@ -0,0 +1,39 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus  # noqa: E402
+import cooc  # noqa: E402
+import gen_net  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """An empty data directory with its own caches; every module-level cache is reset"""
+    cache_dir = tmp_path / '.cache'
+    monkeypatch.setattr(corpus, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setattr(corpus, 'CACHE_DIR', str(cache_dir))
+    monkeypatch.setattr(cooc, 'STORE_DIR', str(cache_dir / 'cooc'))
+    monkeypatch.setattr(cooc, '_checked', False)
+    monkeypatch.setattr(gen_net, 'COMMUNITY_CACHE_DIR', str(cache_dir / 'communities'))
+    monkeypatch.setattr(gen_net, '_partitions', {})
+    corpus.clear_cache()
+    cooc._views.clear()
+    cooc._rows.clear()
+    cooc.clear_query_cache()
+    yield tmp_path
+    corpus.clear_cache()
+    cooc._views.clear()
+    cooc._rows.clear()
+    cooc.clear_query_cache()
+
+
+def write_matrix(path, rows):
+    pd.DataFrame(rows, columns=['Entity1', 'Entity2', 'CoOccurrence']).to_csv(path, index=False)
+
+
+def write_word_freq(path, rows):
+    pd.DataFrame(rows, columns=['word', 'frequency']).to_csv(path, index=False)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+import backbone
+
+
+def _random_symmetric(n=30, density=0.3, seed=0, weights=lambda rng, m: rng.integers(1, 20, m)):
+    rng = np.random.default_rng(seed)
+    upper = sp.triu(sp.random(n, n, density=density, random_state=rng, data_rvs=lambda m: weights(rng, m)), k=1)
+    return (upper + upper.T).tocsr()
+
+
+def _brute_force_pvalues(A):
+    # 逐条边按定义计算 disparity p 值
+    dense = A.toarray()
+    strength = dense.sum(axis=1)
+    degree = (dense != 0).sum(axis=1)
+    result = {}
+    for a in range(len(dense)):
+        for b in range(a + 1, len(dense)):
+            if dense[a, b]:
+                p = [(1 - dense[a, b] / strength[x]) ** (degree[x] - 1) if degree[x] > 1 else 1.0 for x in (a, b)]
+                result[a, b] = min(p)
+    return result
+
+
+def _edges(M):
+    M = M.tocoo()
+    return set(zip(M.row.tolist(), M.col.tolist()))
+
+
+def test_disparity_pvalues_match_definition():
+    A = _random_symmetric()
+    i, j, w, p = backbone.disparity_pvalues(A)
+    expected = _brute_force_pvalues(A)
+    assert len(p) == len(expected)
+    for a, b, value in zip(i, j, p):
+        assert np.isclose(value, expected[a, b])
+
+
+def test_disparity_alpha_cutoff():
+    A = _random_symmetric()
+    expected = {edge for edge, p in _brute_force_pvalues(A).items() if p < 0.2}
+    assert _edges(backbone.backbone(A, alpha=0.2)) == expected
+
+
+def test_max_edges_under_budget_keeps_every_edge():
+    A = _random_symmetric()
+    m = sp.triu(A, k=1).nnz
+    kept = backbone.backbone(A, alpha=None, max_edges=m + 10)
+    assert _edges(kept) == _edges(sp.triu(A, k=1))
+
+
+def test_max_edges_over_budget_keeps_smallest_pvalues():
+    A = _random_symmetric()
+    pvalues = _brute_force_pvalues(A)
+    kept = backbone.backbone(A, alpha=None, max_edges=10)
+    assert kept.nnz == 10
+    worst_kept = max(pvalues[edge] for edge in _edges(kept))
+    assert all(p >= worst_kept for edge, p in pvalues.items() if edge not in _edges(kept))
+
+
+def test_top_k_keeps_each_nodes_heaviest_edges():
+    # 连续权重没有并列，期望的边集合是唯一的
+    A = _random_symmetric(weights=lambda rng, m: rng.uniform(1, 20, m))
+    dense = A.toarray()
+    expected = set()
+    for node in range(len(dense)):
+        neighbors = np.flatnonzero(dense[node])
+        for other in neighbors[np.argsort(-dense[node, neighbors])][:2]:
+            expected.add((min(node, other), max(node, other)))
+    assert _edges(backbone.backbone(A, method='top_k', k=2)) == expected
+
+
+def test_quantile_keeps_heavy_edges():
+    A = _random_symmetric()
+    w = sp.triu(A, k=1).data
+    threshold = np.quantile(w, 0.75)
+    kept = backbone.backbone(A, method='quantile', quantile=0.75)
+    assert kept.nnz == (w >= threshold).sum()
+    assert kept.data.min() >= threshold
+
+
+def test_backbone_edges_merges_duplicate_pairs():
+    df = pd.DataFrame({'Entity1': ['a', 'b', 'a'], 'Entity2': ['b', 'a', 'c'], 'CoOccurrence': [1, 2, 1]})
+    edges = backbone.backbone_edges(df, method='disparity', alpha=None, max_edges=10)
+    assert edges['CoOccurrence'].tolist() == [3, 1]
+    assert {frozenset(pair) for pair in zip(edges['Entity1'], edges['Entity2'])} == {frozenset('ab'), frozenset('ac')}
@@ -0,0 +1,71 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+import centrality
+
+
+def _weighted_graph():
+    G = nx.les_miserables_graph()
+    # 加一个孤立点和一个小分量，检查分量大小修正和悬挂节点
+    G.add_node('isolated')
+    G.add_edge('a', 'b', weight=2)
+    G.add_edge('b', 'c', weight=1)
+    return G
+
+
+def test_exact_betweenness_matches_networkx():
+    G = _weighted_graph()
+    expected = nx.betweenness_centrality(G, weight='weight')
+    result = centrality.betweenness_centrality(G, weight='weight', max_workers=1)
+    assert result == pytest.approx(expected, abs=1e-12)
+
+
+def test_exact_closeness_matches_networkx():
+    G = _weighted_graph()
+    assert centrality.closeness_centrality(G, max_workers=1) == pytest.approx(nx.closeness_centrality(G), abs=1e-12)
+
+
+def test_sampled_betweenness_within_budget():
+    G = nx.barabasi_albert_graph(300, 3, seed=1)
+    expected = nx.betweenness_centrality(G)
+    result = centrality.betweenness_centrality(G, weight=None, epsilon=0.05, seed=0, max_workers=1)
+    assert max(abs(result[node] - expected[node]) for node in G) < 0.05
+
+
+def test_sample_size_is_capped_by_node_count():
+    assert centrality.sample_size(10, 0.01) == 10
+    assert centrality.sample_size(0, 0.1) == 0
+
+
+def test_graph_metrics_match_networkx():
+    G = _weighted_graph()
+    metrics = centrality.graph_metrics(G).set_index('Entity')
+    degree = nx.degree_centrality(G)
+    pagerank = nx.pagerank(G, weight='weight')
+    strength = dict(G.degree(weight='weight'))
+    for node in G:
+        assert metrics.at[node, 'DegreeCentrality'] == pytest.approx(degree[node])
+        assert metrics.at[node, 'WeightedDegree'] == pytest.approx(strength[node])
+        assert metrics.at[node, 'PageRank'] == pytest.approx(pagerank[node], abs=1e-6)
+
+
+def test_eigenvector_matches_networkx_on_connected_graph():
+    G = nx.karate_club_graph()
+    metrics = centrality.graph_metrics(G).set_index('Entity')
+    expected = nx.eigenvector_centrality(G)
+    assert np.allclose([metrics.at[node, 'EigenvectorCentrality'] for node in G], [expected[node] for node in G],
+                       atol=1e-5)
+
+
+def test_yearly_metrics_batches_graphs_independently():
+    graphs = {'2122': nx.karate_club_graph(), '2223': _weighted_graph()}
+    batched = centrality.yearly_metrics(graphs=graphs)
+    assert list(batched['Year'].unique()) == ['2122', '2223']
+    for year, G in graphs.items():
+        alone = centrality.graph_metrics(G).reset_index(drop=True)
+        part = batched[batched['Year'] == year].drop(columns='Year').reset_index(drop=True)
+        # 批量时所有块一起迭代到收敛，结果只在收敛容差内与单独计算一致
+        assert np.allclose(part.drop(columns='Entity').to_numpy(), alone.drop(columns='Entity').to_numpy(),
+                           atol=1e-4)
+        assert list(part['Entity']) == list(alone['Entity'])
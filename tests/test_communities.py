@@ -0,0 +1,85 @@
+import networkx as nx
+import pytest
+
+import gen_net
+
+
+def _planted(groups=3, size=10, offset=0, seed=1):
+    # 组内边稠密、组间边稀疏的图；节点名 n{offset + i}，第 i // size 个组
+    G = nx.planted_partition_graph(groups, size, 0.9, 0.02, seed=seed)
+    G = nx.relabel_nodes(G, {node: f'n{offset + node}' for node in G})
+    nx.set_edge_attributes(G, 1, 'weight')
+    return G
+
+
+def _blocks(partition):
+    members = {}
+    for node, cid in partition.items():
+        members.setdefault(cid, set()).add(node)
+    return sorted(map(sorted, members.values()))
+
+
+def _planted_blocks(groups=3, size=10, offset=0):
+    return sorted(sorted(f'n{offset + g * size + i}' for i in range(size)) for g in range(groups))
+
+
+@pytest.mark.parametrize('method', ['best', 'coassociation'])
+def test_seeded_consensus_is_deterministic(data_dir, method):
+    G = _planted()
+    serial = gen_net.consensus_communities(G, method=method, max_workers=1, use_cache=False)
+    assert gen_net.consensus_communities(G, method=method, max_workers=1, use_cache=False) == serial
+    assert gen_net.consensus_communities(G, method=method, max_workers=2, use_cache=False) == serial
+
+    partition, stability = serial
+    assert _blocks(partition) == _planted_blocks()
+    # 社区ID按大小、再按最小节点名编号
+    assert [partition[f'n{g * 10}'] for g in range(3)] == [0, 1, 2]
+    assert set(stability) == set(G) and all(0 < value <= 1 for value in stability.values())
+
+
+def test_consensus_is_memoized_by_graph_content(data_dir):
+    G = _planted()
+    first = gen_net.consensus_communities(G, max_workers=1)
+    H = nx.Graph()
+    H.add_nodes_from(reversed(list(G.nodes())))
+    H.add_edges_from((v, u, data) for u, v, data in reversed(list(G.edges(data=True))))
+    assert gen_net.consensus_communities(H, max_workers=1) == first
+
+
+def test_node_stability_is_mean_jaccard():
+    nodes = ['a', 'b', 'c', 'd']
+    final = {'a': 0, 'b': 0, 'c': 1, 'd': 1}
+    runs = [dict(final), {'a': 0, 'b': 1, 'c': 1, 'd': 1}]
+    # 第二次运行: a 的社区 {a} 与 {a, b} 的 Jaccard 为 1/2，b 的 {b, c, d} 与 {a, b} 为 1/4，c、d 为 2/3
+    stability = gen_net._node_stability(nodes, final, runs)
+    assert stability == pytest.approx({'a': 0.75, 'b': 0.625, 'c': 5 / 6, 'd': 5 / 6})
+
+
+def test_match_communities_carries_ids_and_hands_out_new_ones():
+    previous = {'a': 5, 'b': 5, 'c': 7, 'd': 7}
+    partition = {'a': 0, 'b': 0, 'c': 1, 'd': 1, 'e': 2, 'f': 2, 'g': 3}
+    matched, next_id = gen_net.match_communities(partition, previous, 8)
+    assert matched == {'a': 5, 'b': 5, 'c': 7, 'd': 7, 'e': 8, 'f': 8, 'g': 9}
+    assert next_id == 10
+
+
+def test_match_communities_is_one_to_one():
+    # 上期的社区 5 分裂成两个: 重叠大的一个延续ID，另一个拿新ID
+    previous = {'a': 5, 'b': 5, 'c': 5, 'd': 7}
+    partition = {'a': 0, 'b': 0, 'c': 1, 'd': 2}
+    matched, next_id = gen_net.match_communities(partition, previous, 8)
+    assert matched == {'a': 5, 'b': 5, 'c': 8, 'd': 7}
+    assert next_id == 9
+
+
+def test_temporal_communities_carry_ids_across_periods(data_dir):
+    first, next_id = gen_net.temporal_communities(_planted(), max_workers=1)
+    assert next_id == 3
+
+    # 下一时期: 原来的三个组都还在，另有一个全新的组
+    G = nx.union(_planted(), _planted(groups=1, offset=30, seed=2))
+    G.add_edge('n0', 'n30', weight=1)
+    second, next_id = gen_net.temporal_communities(G, first, next_id, max_workers=1)
+    assert all(second[node] == first[node] for node in first)
+    assert {second[f'n{30 + i}'] for i in range(10)} == {3}
+    assert next_id == 4
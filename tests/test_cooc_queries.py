@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import corpus
+import cooc
+from conftest import write_matrix, write_word_freq
+
+
+@pytest.fixture
+def store(data_dir):
+    write_matrix(data_dir / '2122_matrix_article.csv',
+                 [('研发', '创新', 3), ('研发', '上海', 1), ('上海', '松江', 2)])
+    write_matrix(data_dir / '2223_matrix_article.csv',
+                 [('研发', '创新', 4), ('创新', '松江', 6)])
+    write_word_freq(data_dir / '2122_t_f.csv', [('研发', 1)])
+    write_word_freq(data_dir / '2223_t_f.csv', [('研发', 1)])
+    cooc.compile_store()
+    return data_dir
+
+
+def test_neighbors(store):
+    result = cooc.neighbors('研发', k=None)
+    assert result[['Entity', 'CoOccurrence']].values.tolist() == [['创新', 7], ['上海', 1]]
+    assert cooc.neighbors('研发', '2223', k=1)['Entity'].tolist() == ['创新']
+
+
+def test_unknown_entity_gives_empty_results(store):
+    result = cooc.neighbors('不存在', k=10)
+    assert result.empty
+    assert list(result.columns) == ['Entity', 'Entity_code', 'CoOccurrence']
+
+    series = cooc.pair_series('研发', '不存在')
+    assert series.tolist() == [0] * len(corpus.periods())
+    assert series.index.tolist() == corpus.periods()
+
+    assert cooc.ego_graph('不存在').number_of_nodes() == 0
+
+
+def test_pair_series_and_ego_graph(store):
+    assert cooc.pair_series('创新', '研发').tolist() == [3, 4]
+    G = cooc.ego_graph('上海')
+    assert sorted(G.nodes) == ['上海', '松江', '研发']
+    assert G['上海']['松江']['weight'] == 2
+
+
+def test_partner_trend_plot_for_unknown_entity(store):
+    import data_visualize
+
+    fig = data_visualize.create_partner_trend_plot('不存在')
+    assert len(fig.data) == 0
+
+
+def test_partner_trend_plot_partitions_serially(store, monkeypatch):
+    import gen_net
+    import data_visualize
+
+    calls = []
+    detect = gen_net.detect_communities
+    monkeypatch.setattr(gen_net, 'detect_communities', lambda G, **kwargs: calls.append(kwargs) or detect(G, **kwargs))
+    fig = data_visualize.create_partner_trend_plot('研发')
+    assert [call['max_workers'] for call in calls] == [1]
+    assert {'创新', '上海'} <= {trace.name for trace in fig.data}
+
+
+@pytest.fixture
+def random_store(data_dir):
+    rng = np.random.default_rng(0)
+    words = [f'词{i}' for i in range(25)]
+    frames = {}
+    for period in ('2122', '2223', '2324'):
+        # 重复词对、反向词对和自共现都会出现
+        frame = pd.DataFrame({'Entity1': rng.choice(words, 300), 'Entity2': rng.choice(words, 300),
+                              'CoOccurrence': rng.integers(1, 10, 300)})
+        write_matrix(data_dir / f'{period}_matrix_article.csv', frame.values.tolist())
+        write_word_freq(data_dir / f'{period}_t_f.csv', [(words[0], 1)])
+        frames[period] = frame
+    cooc.compile_store()
+    return frames
+
+
+def _expected_pairs(frames, periods):
+    # pandas 参考实现：按编码把无向词对规范成 (小, 大) 再分组求和
+    frame = pd.concat([frames[period] for period in periods], ignore_index=True)
+    a, b = corpus.lookup(frame['Entity1']), corpus.lookup(frame['Entity2'])
+    canonical = pd.DataFrame({'Entity1_code': np.minimum(a, b), 'Entity2_code': np.maximum(a, b),
+                              'CoOccurrence': frame['CoOccurrence']})
+    return canonical.groupby(['Entity1_code', 'Entity2_code'])['CoOccurrence'].sum()
+
+
+def _as_series(table):
+    return table.set_index(['Entity1_code', 'Entity2_code'])['CoOccurrence']
+
+
+def test_pairs_matches_groupby(random_store):
+    expected = _expected_pairs(random_store, random_store)
+    result = cooc.pairs()
+    assert result['CoOccurrence'].is_monotonic_decreasing
+    assert (result['Entity1_code'] <= result['Entity2_code']).all()
+    assert _as_series(result).sort_index().to_dict() == expected.to_dict()
+    assert (corpus.lookup(result['Entity1']) == result['Entity1_code']).all()
+
+    yearly = _expected_pairs(random_store, ['2223'])
+    assert _as_series(cooc.pairs('2223')).sort_index().to_dict() == yearly.to_dict()
+
+
+def test_pairs_threshold_is_strict(random_store):
+    expected = _expected_pairs(random_store, random_store)
+    threshold = int(expected.median())
+    assert (expected == threshold).any()  # 恰好等于阈值的词对不保留
+    result = cooc.pairs(threshold=threshold)
+    assert _as_series(result).sort_index().to_dict() == expected[expected > threshold].to_dict()
+
+
+def test_pairs_top_k(random_store):
+    expected = _expected_pairs(random_store, random_store)
+    result = cooc.pairs(k=15)
+    assert len(result) == 15
+    # 第k个值并列时取哪几个不确定，只比较共现次数
+    assert result['CoOccurrence'].tolist() == expected.sort_values(ascending=False).iloc[:15].tolist()
+    assert cooc.pairs(threshold=expected.max() - 1, k=1000)['CoOccurrence'].tolist() == \
+        expected[expected == expected.max()].tolist()
+
+
+def test_pairs_by_year(random_store):
+    result = cooc.pairs(k=20, by_year=True)
+    for period in random_store:
+        yearly = _expected_pairs(random_store, [period])
+        keys = list(zip(result['Entity1_code'], result['Entity2_code']))
+        assert result[period].tolist() == [yearly.get(key, 0) for key in keys]
+    assert (result[list(random_store)].sum(axis=1) == result['CoOccurrence']).all()
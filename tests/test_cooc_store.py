@@ -0,0 +1,104 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+import corpus
+import cooc
+from conftest import write_matrix, write_word_freq
+
+
+def _dense_by_name(m):
+    vocab = corpus.vocabulary()
+    coo = cooc.symmetric(m).tocoo()
+    return {(vocab[i], vocab[j]): int(v) for i, j, v in zip(coo.row, coo.col, coo.data)}
+
+
+def _freq_by_name(freq):
+    vocab = corpus.vocabulary()
+    return {vocab[i]: int(v) for i, v in enumerate(freq) if v}
+
+
+@pytest.fixture
+def sharded(data_dir):
+    # 一个时期拆成主文件和两个分片，含重复词对、反向词对、自共现和像数字的实体
+    write_matrix(data_dir / '2122_matrix_article.csv',
+                 [('研发', '创新', 3), ('创新', '研发', 2), ('上海', '松江', 1)])
+    write_matrix(data_dir / '2122_matrix_article.part-0001.csv',
+                 [('2000', '2001', 4)] * 50 + [('研发', '创新', 1), ('研发', '研发', 7)])
+    write_matrix(data_dir / '2122_matrix_article.part-0002.csv',
+                 [('松江', '上海', 5), ('2001', '研发', 2)])
+    write_word_freq(data_dir / '2122_t_f.csv', [('研发', 10), ('上海', 3)])
+    write_word_freq(data_dir / '2122_t_f.part-0001.csv', [('研发', 5), ('2000', 1)])
+    write_matrix(data_dir / '2223_matrix_article.csv', [('研发', '上海', 9)])
+    write_word_freq(data_dir / '2223_t_f.csv', [('上海', 4)])
+    return data_dir
+
+
+EXPECTED_2122 = {
+    ('研发', '创新'): 6, ('创新', '研发'): 6,
+    ('上海', '松江'): 6, ('松江', '上海'): 6,
+    ('2000', '2001'): 200, ('2001', '2000'): 200,
+    ('2001', '研发'): 2, ('研发', '2001'): 2,
+    ('研发', '研发'): 7,
+}
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_compile_reads_every_shard(sharded, streaming):
+    # 很小的块，流式路径会经过多次分批合并；第一块里的实体都像数字
+    cooc.compile_store(streaming=streaming, chunk_bytes=64)
+    assert _dense_by_name(cooc.year_matrix('2122')) == EXPECTED_2122
+    assert _freq_by_name(cooc.word_frequencies('2122')) == {'研发': 15, '上海': 3, '2000': 1}
+    assert _dense_by_name(cooc.all_years_matrix())[('研发', '上海')] == 9
+
+
+def test_streaming_matches_in_memory(sharded):
+    cooc.compile_store(streaming=False)
+    in_memory = _dense_by_name(cooc.year_matrix('2122'))
+    cooc.compile_store(force=True, streaming=True, chunk_bytes=64)
+    assert _dense_by_name(cooc.year_matrix('2122')) == in_memory
+
+
+def test_new_shard_triggers_recompile_with_its_rows(sharded):
+    cooc.compile_store()
+    write_matrix(sharded / '2122_matrix_article.part-0003.csv', [('创新', '上海', 11)])
+    cooc._checked = False
+    cooc._views.clear()
+    assert _dense_by_name(cooc.year_matrix('2122'))[('上海', '创新')] == 11
+
+
+def test_numeric_looking_text_columns_stay_strings(data_dir):
+    path = data_dir / '2122_matrix_article.csv'
+    write_matrix(path, [(str(2000 + i), str(3000 + i), 1) for i in range(2000)] + [('研发', '创新', 1)])
+    chunks = list(corpus.iter_csv_chunks([str(path)], cooc.MATRIX_COLUMNS, chunk_bytes=1 << 10))
+    assert len(chunks) > 1
+    assert all(chunk['Entity1'].map(type).eq(str).all() for chunk in chunks)
+    assert chunks[-1]['Entity1'].iloc[-1] == '研发'
+    assert np.issubdtype(chunks[0]['CoOccurrence'].dtype, np.integer)
+
+
+def _compile_in(data_dir):
+    # 模拟一个新的流水线进程: 各自的进程内缓存为空，首次访问时检查存储
+    corpus.DATA_DIR = data_dir
+    corpus.CACHE_DIR = os.path.join(data_dir, '.cache')
+    cooc.STORE_DIR = os.path.join(corpus.CACHE_DIR, 'cooc')
+    cooc._checked = False
+    corpus.clear_cache()
+    cooc._views.clear()
+    cooc.clear_query_cache()
+    return int(cooc.pairs()['CoOccurrence'].sum())
+
+
+def test_concurrent_first_access_is_safe(sharded):
+    # 词表由加载阶段预先建好（与流水线一致），这里只测存储本身的并发
+    corpus.encode(['研发', '创新', '上海', '松江', '2000', '2001'])
+    with ProcessPoolExecutor(8) as pool:
+        totals = list(pool.map(_compile_in, [str(sharded)] * 16))
+    assert totals == [totals[0]] * 16
+    # 存储已是最新时，再次访问不改写 store.json
+    stamp = os.stat(cooc._meta_path()).st_mtime_ns
+    with ProcessPoolExecutor(8) as pool:
+        assert list(pool.map(_compile_in, [str(sharded)] * 16)) == totals
+    assert os.stat(cooc._meta_path()).st_mtime_ns == stamp
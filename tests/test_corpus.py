@@ -0,0 +1,149 @@
+import os
+
+import corpus
+import cooc
+from conftest import write_matrix, write_word_freq
+
+
+def test_cached_frame_gains_missing_code_columns(data_dir):
+    path = str(data_dir / '2122_matrix_article.csv')
+    write_matrix(path, [('研发', '创新', 3)])
+    plain = corpus.read_table(path)
+    assert 'Entity1_code' not in plain
+    coded = corpus.read_table(path, corpus.CODE_COLUMNS['matrix'])
+    assert list(corpus.decode(coded['Entity1_code'])) == ['研发']
+    assert list(corpus.decode(coded['Entity2_code'])) == ['创新']
+
+
+def test_vocabulary_signature_tracks_prefix(data_dir):
+    corpus.encode(['a', 'b'])
+    signature = corpus.vocabulary_signature()
+    corpus.encode(['c'])
+    # 只追加时旧前缀仍然有效
+    assert corpus.vocabulary_unchanged(signature)
+    os.remove(corpus._vocab_path())
+    corpus.clear_cache()
+    corpus.encode(['b', 'a'])
+    assert not corpus.vocabulary_unchanged(signature)
+
+
+def test_code_artifacts_are_invalidated_by_a_rebuilt_vocabulary(data_dir):
+    write_matrix(data_dir / '2122_matrix_article.csv', [('研发', '创新', 3)])
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return corpus.encode(['研发'])[0]
+
+    first = corpus.period_artifact('codes', '2122', compute, codes=True)
+    assert corpus.period_artifact('codes', '2122', compute, codes=True) == first
+    assert len(calls) == 1
+
+    os.remove(corpus._vocab_path())
+    corpus.clear_cache()
+    corpus.encode(['其他'])
+    second = corpus.period_artifact('codes', '2122', compute, codes=True)
+    assert len(calls) == 2
+    assert corpus.decode([second])[0] == '研发'
+
+
+def test_store_is_recompiled_after_vocabulary_reset(data_dir):
+    write_matrix(data_dir / '2122_matrix_article.csv', [('研发', '创新', 3)])
+    cooc.compile_store()
+
+    os.remove(corpus._vocab_path())
+    corpus.clear_cache()
+    corpus.encode(['其他', '无关'])
+    cooc._checked = False
+    cooc._views.clear()
+    cooc.clear_query_cache()
+    assert cooc.neighbors('研发')['Entity'].tolist() == ['创新']
+
+
+def test_loaders_read_every_shard(data_dir):
+    # 2122 有主文件和分片，2223 只有分片
+    write_matrix(data_dir / '2122_matrix_article.csv', [('研发', '创新', 3)])
+    write_matrix(data_dir / '2122_matrix_article.part-0001.csv', [('上海', '松江', 2)])
+    write_matrix(data_dir / '2223_matrix_article.part-0001.csv', [('研发', '上海', 1)])
+    write_word_freq(data_dir / '2223_t_f.part-0001.csv', [('研发', 4)])
+    write_word_freq(data_dir / '2223_t_f.part-0002.csv', [('上海', 5)])
+
+    matrices = corpus.load_matrices()
+    assert matrices['2122'][['Entity1', 'Entity2']].values.tolist() == [['研发', '创新'], ['上海', '松江']]
+    assert list(corpus.decode(matrices['2122']['Entity1_code'])) == ['研发', '上海']
+    assert matrices['2223']['CoOccurrence'].tolist() == [1]
+    assert corpus.load_word_freqs(['2223'])['2223']['word'].tolist() == ['研发', '上海']
+    # 第二次读取直接用进程内缓存
+    assert corpus.load_matrices(['2122'])['2122'] is matrices['2122']
+
+
+def test_warm_corpus_skips_streamed_periods(data_dir, monkeypatch):
+    import data_visualize
+
+    write_matrix(data_dir / '2122_matrix_article.csv', [('研发', '创新', 3)])
+    write_word_freq(data_dir / '2122_t_f.csv', [('研发', 1)])
+    (data_dir / 'entity_dict.csv').write_text('entity\n研发\n', encoding='utf-8')
+    monkeypatch.setattr(cooc, 'STREAM_MIN_BYTES', 0)
+    data_visualize.warm_corpus()
+    assert str(data_dir / '2122_matrix_article.csv') not in corpus._frames
+    assert cooc.neighbors('研发')['Entity'].tolist() == ['创新']
+
+
+def test_label_columns_are_categoricals_over_the_vocabulary(data_dir):
+    write_matrix(data_dir / '2122_matrix_article.csv', [('研发', '创新', 3)])
+    write_matrix(data_dir / '2122_matrix_article.part-0001.csv', [('上海', '研发', 2)])
+    corpus.read_table(str(data_dir / '2122_matrix_article.csv'), corpus.CODE_COLUMNS['matrix'])
+    # 第二个分片编码时词表变长，两个分片的类别不同，拼接后仍是同一个 Categorical
+    df = corpus.load_matrices(['2122'])['2122']
+    for column in ('Entity1', 'Entity2'):
+        assert df[column].dtype == corpus.label_dtype()
+        assert (df[column].cat.codes.to_numpy() == df[f'{column}_code'].to_numpy()).all()
+    assert df['Entity1'].tolist() == ['研发', '上海']
+    assert (df['Entity1'] == df['Entity2']).tolist() == [False, False]
+
+
+def _counting(calls, period, value):
+    def compute():
+        calls.append(period)
+        return value
+    return compute
+
+
+def test_period_artifact_recomputes_only_changed_periods(data_dir):
+    for period in ('2122', '2223'):
+        write_matrix(data_dir / f'{period}_matrix_article.csv', [('研发', '创新', 1)])
+        write_word_freq(data_dir / f'{period}_t_f.csv', [('研发', 1)])
+    calls = []
+    for period in ('2122', '2223'):
+        assert corpus.period_artifact('counts', period, _counting(calls, period, period)) == period
+        assert corpus.period_artifact('counts', period, _counting(calls, period, 'stale')) == period
+    assert calls == ['2122', '2223']
+
+    # 只改 2223 的词频表: 只有 2223 重新计算
+    write_word_freq(data_dir / '2223_t_f.csv', [('研发', 1), ('创新', 2)])
+    for period in ('2122', '2223'):
+        corpus.period_artifact('counts', period, _counting(calls, period, 'new'))
+    assert calls == ['2122', '2223', '2223']
+
+    # 新增分片同样让该时期失效
+    write_matrix(data_dir / '2122_matrix_article.part-0001.csv', [('上海', '松江', 1)])
+    assert corpus.period_artifact('counts', '2122', _counting(calls, '2122', 'sharded')) == 'sharded'
+    assert calls[-1] == '2122'
+
+
+def test_period_artifact_version_and_explicit_sources(data_dir):
+    write_matrix(data_dir / '2122_matrix_article.csv', [('研发', '创新', 1)])
+    extra = data_dir / 'extra.txt'
+    extra.write_text('a', encoding='utf-8')
+    calls = []
+    sources = [corpus.matrix_path('2122'), str(extra)]
+    corpus.period_artifact('thing', '2122', _counting(calls, 'v1', 1), sources=sources)
+    corpus.period_artifact('thing', '2122', _counting(calls, 'v1', 1), sources=sources)
+    assert corpus.period_artifact('thing', '2122', _counting(calls, 'v2', 2), sources=sources, version=2) == 2
+    assert corpus.period_artifact('thing', '2122', _counting(calls, 'v2', 2), sources=sources, version=2) == 2
+    assert calls == ['v1', 'v2']
+
+    # 显式给出的源文件变化（大小改变）同样失效
+    extra.write_text('ab', encoding='utf-8')
+    assert corpus.period_artifact('thing', '2122', _counting(calls, 'v2', 3), sources=sources, version=2) == 3
+    assert calls == ['v1', 'v2', 'v2']
@@ -0,0 +1,30 @@
+import os
+
+import figure_cache
+
+
+def _module_source(name):
+    with open(os.path.join(figure_cache.REPO_DIR, f'{name}.py'), encoding='utf-8') as f:
+        return f.read()
+
+
+def _builder():
+    import gen_net
+    return gen_net
+
+
+def test_code_sources_follow_local_imports_transitively():
+    sources = figure_cache._code_sources(_builder)
+    # gen_net 在函数内部导入 layout 和 centrality，它们的改动也要让缓存失效
+    for name in ('gen_net', 'cooc', 'corpus', 'layout', 'centrality'):
+        assert _module_source(name) in sources
+    assert len(sources) == len(set(sources))
+
+
+def test_code_sources_include_module_constants(monkeypatch):
+    import data_visualize
+
+    before = figure_cache._code_sources(data_visualize.create_heatmap)
+    assert f'HEATMAP_MAX_ENTITIES = {data_visualize.HEATMAP_MAX_ENTITIES!r}' in before
+    monkeypatch.setattr(data_visualize, 'HEATMAP_MAX_ENTITIES', data_visualize.HEATMAP_MAX_ENTITIES + 1)
+    assert figure_cache._code_sources(data_visualize.create_heatmap) != before
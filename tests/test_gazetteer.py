@@ -0,0 +1,91 @@
+import random
+
+import pandas as pd
+import pytest
+
+import gazetteer
+
+
+@pytest.fixture(scope='module')
+def automaton():
+    return gazetteer.build_automaton()
+
+
+def _brute_force_mentions(text):
+    # 逐个起点试所有变体，取最长的；匹配不重叠
+    lookup = gazetteer.variant_lookup()
+    mentions, start = [], 0
+    while start < len(text):
+        hits = [variant for variant in lookup if text.startswith(variant, start)]
+        if not hits:
+            start += 1
+            continue
+        variant = max(hits, key=len)
+        start += len(variant)
+        if not gazetteer.NON_PLACE_SUFFIX.match(text, start):
+            mentions.append(lookup[variant])
+    return mentions
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('苏州工业园区管委会', ['苏州工业园']),
+    ('上海松江', ['上海', '松江']),
+    ('南京路步行街', []),
+    ('南京东路', []),
+    ('苏州河', []),
+    ('上海市人民政府', ['上海']),
+    ('杭州湾', ['杭州湾']),
+    ('长三角', []),
+])
+def test_find_mentions(automaton, text, expected):
+    assert gazetteer.find_mentions(text, automaton) == expected
+
+
+def test_find_mentions_matches_brute_force(automaton):
+    rng = random.Random(0)
+    pieces = list(gazetteer.variant_lookup()) + ['路', '河', '区', '的', '东', '合作', '一体化']
+    for _ in range(500):
+        text = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 8)))
+        assert gazetteer.find_mentions(text, automaton) == _brute_force_mentions(text)
+
+
+def test_place_frequencies():
+    df = pd.DataFrame({
+        'year': [2020, 2020, 2020, 2021, 2021],
+        'word': ['上海', '上海松江', '南京路', '上海市', '苏州河'],
+        'frequency': [5, 2, 7, 3, 4],
+    })
+    compound = gazetteer.place_frequencies(df, by='year').set_index(['place', 'year'])['frequency']
+    assert compound.to_dict() == {('上海', 2020): 7, ('松江', 2020): 2, ('上海', 2021): 3}
+
+    exact = gazetteer.place_frequencies(df, exact=True).set_index('place')['frequency']
+    assert exact.to_dict() == {'上海': 8}
+
+
+def test_within_radius_sorted_by_distance():
+    names = gazetteer.within_radius('上海', 55)
+    assert names == ['上海', '虹桥', '张江', '松江', '昆山', '临港']
+    distances = [gazetteer.distance_km('上海', name) for name in names]
+    assert distances == sorted(distances) and distances[-1] <= 55
+    outside = set(gazetteer.PLACES) - set(names)
+    assert all(gazetteer.distance_km('上海', name) > 55 for name in outside)
+
+
+def test_within_bbox_matches_scan():
+    box = (120.0, 30.5, 121.5, 31.5)
+    expected = [name for name, (_, lon, lat) in gazetteer.PLACES.items()
+                if box[0] <= lon <= box[2] and box[1] <= lat <= box[3]]
+    assert gazetteer.within_bbox(*box) == expected
+
+
+def test_every_place_belongs_to_one_province():
+    tagged = [name for names in gazetteer.PROVINCES.values() for name in names]
+    assert sorted(tagged) == sorted(gazetteer.PLACES)
+
+
+def test_spatial_queries_filter_by_province():
+    # 上海地图只含上海的地名，不含距离上很近的昆山
+    assert gazetteer.within_radius('上海', 55, province='上海') == ['上海', '虹桥', '张江', '松江', '临港']
+    box = (120.0, 30.5, 121.5, 31.5)
+    assert gazetteer.within_bbox(*box, province='江苏') == [name for name in gazetteer.within_bbox(*box)
+                                                             if name in gazetteer.PROVINCES['江苏']]
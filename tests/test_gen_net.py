@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import corpus
+import gen_net
+from conftest import write_matrix
+
+
+def _random_matrix(rows=400, entities=30, seed=0):
+    # 含重复词对、反向词对和自共现
+    rng = np.random.default_rng(seed)
+    words = np.array([f'词{i}' for i in range(entities)], dtype=object)
+    return pd.DataFrame({'Entity1': words[rng.integers(0, entities, rows)],
+                         'Entity2': words[rng.integers(0, entities, rows)],
+                         'CoOccurrence': rng.integers(1, 10, rows)})
+
+
+def _brute_force(df):
+    totals = {}
+    for a, b, w in zip(df['Entity1'], df['Entity2'], df['CoOccurrence']):
+        key = frozenset([a, b])
+        totals[key] = totals.get(key, 0) + int(w)
+    return totals
+
+
+def _aggregated(edges):
+    result = {}
+    for a, b, w in zip(edges['Entity1'], edges['Entity2'], edges['CoOccurrence']):
+        key = frozenset([a, b])
+        assert key not in result
+        result[key] = int(w)
+    return result
+
+
+def test_aggregate_edges_matches_brute_force():
+    df = _random_matrix()
+    expected = _brute_force(df)
+    assert any(len(key) == 1 for key in expected)
+    assert _aggregated(gen_net.aggregate_edges(df)) == expected
+
+
+def test_aggregate_edges_on_coded_corpus_frames(data_dir):
+    # 语料表带编码列、标签列是 Categorical 时走按编码分解的路径，结果相同
+    df = _random_matrix(seed=1)
+    write_matrix(data_dir / '2122_matrix_article.csv', df.values.tolist())
+    coded = corpus.load_matrices(['2122'])['2122']
+    assert 'Entity1_code' in coded
+    assert _aggregated(gen_net.aggregate_edges(coded)) == _brute_force(df)
+    # 节点顺序（首次出现的顺序）也与按标签分解一致
+    assert list(gen_net._edge_codes(coded)[2]) == list(gen_net._edge_codes(df)[2])
+
+
+def test_undirected_graph_weights(data_dir):
+    df = _random_matrix(seed=2)
+    G = gen_net.generate_undirected_graph(df)
+    expected = _brute_force(df)
+    assert G.number_of_edges() == len(expected)
+    for key, weight in expected.items():
+        a, b = (tuple(key) * 2)[:2]
+        assert G[a][b]['weight'] == weight
+
+
+@pytest.mark.parametrize('columns', [('Entity1', 'Entity2'), ('Entity1_code', 'Entity2_code')])
+def test_entity_strength_counts_self_pairs_once(columns):
+    df = pd.DataFrame({'Entity1': ['a', 'a', 'b'], 'Entity2': ['b', 'a', 'c'], 'CoOccurrence': [2, 5, 1],
+                       'Entity1_code': [0, 0, 1], 'Entity2_code': [1, 0, 2]})
+    strength = gen_net.entity_strength(df, columns)
+    # a: 2 + 自共现5（只计一次），b: 2 + 1，c: 1
+    names = {'a': 'a', 'b': 'b', 'c': 'c'} if columns[0] == 'Entity1' else {'a': 0, 'b': 1, 'c': 2}
+    assert strength.to_dict() == {names['a']: 7, names['b']: 3, names['c']: 1}
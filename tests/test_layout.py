@@ -0,0 +1,48 @@
+import os
+import shutil
+
+import networkx as nx
+import numpy as np
+
+import corpus
+import layout
+
+
+def _graphs():
+    G1 = nx.les_miserables_graph()
+    G2 = G1.copy()
+    G2.add_edge('Valjean', 'new', weight=3)
+    return G1, G2
+
+
+def _same(a, b):
+    return a.keys() == b.keys() and all(np.allclose(a[node], b[node]) for node in a)
+
+
+def test_force_layout_is_deterministic():
+    G, _ = _graphs()
+    assert _same(layout.force_layout(G, seed=1), layout.force_layout(G, seed=1))
+
+
+def test_unchanged_graph_reuses_layout(data_dir):
+    G1, G2 = _graphs()
+    layout.cached_layout(G1, name='net', seed=1)
+    first = layout.cached_layout(G2, name='net', seed=1)
+    assert _same(layout.cached_layout(G2, name='net', seed=1), first)
+
+
+def test_cache_key_includes_warm_start_layout(data_dir):
+    G1, G2 = _graphs()
+    layout.cached_layout(G1, name='net', seed=1)
+    warm = layout.cached_layout(G2, name='net', seed=1)
+
+    # 没有最新布局时从头计算，不能取到上面从 G1 热启动得到的结果
+    shutil.rmtree(os.path.join(corpus.CACHE_DIR, 'layouts', 'latest'))
+    cold = layout.cached_layout(G2, name='net', seed=1)
+    assert _same(cold, layout.cached_layout(G2, seed=1, use_cache=False))
+    assert not _same(cold, warm)
+
+    # 同样的起点布局得到同样的结果
+    shutil.rmtree(os.path.join(corpus.CACHE_DIR, 'layouts'))
+    layout.cached_layout(G1, name='net', seed=1)
+    assert _same(layout.cached_layout(G2, name='net', seed=1), warm)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import parallel_coordinate
+
+
+def _dense_knn(X, k, metric):
+    # 参考实现: 完整的 n×n 相似度矩阵，每行取前k个（不含自身），两端任一方选中即保留，只保留正相似度
+    X = np.asarray(X, dtype=float)
+    if metric == 'correlation':
+        X = X - X.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(X, axis=1)
+    X = X / np.where(norms > 0, norms, 1)[:, None]
+    S = X @ X.T
+    n = len(X)
+    edges = {}
+    for a in range(n):
+        others = [b for b in range(n) if b != a]
+        for b in sorted(others, key=lambda b: -S[a, b])[:k]:
+            if S[a, b] > 0:
+                edges[min(a, b), max(a, b)] = S[a, b]
+    return edges
+
+
+def _as_dict(i, j, similarity):
+    assert (i < j).all()
+    return dict(zip(zip(i.tolist(), j.tolist()), similarity.tolist()))
+
+
+@pytest.mark.parametrize('metric', ['cosine', 'correlation'])
+@pytest.mark.parametrize('block_rows', [1, 7, 512])
+def test_blocked_knn_matches_dense_top_k(metric, block_rows):
+    rng = np.random.default_rng(0)
+    X = rng.gamma(1.0, 10.0, size=(60, 4))
+    X[5] = 0  # 全零行没有正相似度的近邻
+    result = _as_dict(*parallel_coordinate.knn_similarity_edges(X, k=4, metric=metric, block_rows=block_rows))
+    expected = _dense_knn(X, 4, metric)
+    assert result.keys() == expected.keys()
+    assert np.allclose([result[key] for key in expected], list(expected.values()))
+
+
+def test_knn_with_k_at_least_n_is_the_positive_complete_graph():
+    X = np.array([[1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+    result = _as_dict(*parallel_coordinate.knn_similarity_edges(X, k=10))
+    assert result.keys() == {(0, 1), (1, 2)}
+    assert result[0, 1] == pytest.approx(1 / np.sqrt(2))
+
+
+def test_knn_degenerate_inputs():
+    assert all(len(part) == 0 for part in parallel_coordinate.knn_similarity_edges(np.ones((1, 3)), k=5))
+    with pytest.raises(ValueError):
+        parallel_coordinate.knn_similarity_edges(np.ones((3, 3)), metric='euclidean')
@@ -0,0 +1,76 @@
+import pytest
+
+import pipeline
+
+
+def _record(log_path, name, value):
+    # 各阶段（可能在不同进程里）把开始和结束追加到同一个日志文件
+    with open(log_path, 'a', encoding='utf-8') as f:
+        f.write(f'start {name}\n')
+    with open(log_path, 'a', encoding='utf-8') as f:
+        f.write(f'end {name}\n')
+    return value
+
+
+def _fail():
+    raise RuntimeError('stage failed')
+
+
+def _diamond(log_path):
+    # load -> (a, b) -> figure；a 和 b 互相独立
+    return [
+        pipeline.Stage('figure', _record, (log_path, 'figure', 4), ['a', 'b']),
+        pipeline.Stage('a', _record, (log_path, 'a', 2), ['load']),
+        pipeline.Stage('b', _record, (log_path, 'b', 3), ['load']),
+        pipeline.Stage('load', _record, (log_path, 'load', 1)),
+    ]
+
+
+def _events(log_path):
+    with open(log_path, encoding='utf-8') as f:
+        return [tuple(line.split()) for line in f]
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_stages_run_once_after_their_dependencies(tmp_path, max_workers):
+    log_path = str(tmp_path / 'log.txt')
+    stages = _diamond(log_path)
+    results = pipeline.run(stages, max_workers=max_workers)
+    assert results == {'load': 1, 'a': 2, 'b': 3, 'figure': 4}
+
+    events = _events(log_path)
+    assert sorted(name for event, name in events if event == 'start') == ['a', 'b', 'figure', 'load']
+    for stage in stages:
+        start = events.index(('start', stage.name))
+        assert all(events.index(('end', dep)) < start for dep in stage.deps)
+
+
+def test_serial_and_pooled_results_match(tmp_path):
+    stages = [pipeline.Stage(f's{i}', _record, (str(tmp_path / 'log.txt'), f's{i}', i * i), [f's{i - 1}'] if i else [])
+              for i in range(6)]
+    assert pipeline.run(stages, max_workers=1) == pipeline.run(stages, max_workers=3)
+
+
+def test_unknown_dependency_is_rejected():
+    stages = [pipeline.Stage('figure', _fail, deps=['missing'])]
+    with pytest.raises(ValueError, match="unknown stage.*missing"):
+        pipeline.run(stages, max_workers=1)
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_dependency_cycle_is_rejected(tmp_path, max_workers):
+    log_path = str(tmp_path / 'log.txt')
+    stages = [
+        pipeline.Stage('load', _record, (log_path, 'load', 1)),
+        pipeline.Stage('a', _record, (log_path, 'a', 2), ['load', 'b']),
+        pipeline.Stage('b', _record, (log_path, 'b', 3), ['a']),
+    ]
+    with pytest.raises(ValueError, match='dependency cycle'):
+        pipeline.run(stages, max_workers=max_workers)
+    # 环外的阶段照常运行，环上的阶段一个都不运行
+    assert [name for event, name in _events(log_path) if event == 'start'] == ['load']
+
+
+def test_stage_errors_propagate():
+    with pytest.raises(RuntimeError, match='stage failed'):
+        pipeline.run([pipeline.Stage('bad', _fail)], max_workers=2)